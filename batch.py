@@ -0,0 +1,75 @@
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from config import BATCH_DIR, BATCH_JOBS
+from main import setup_logging
+from utils.job_queue import read_topics
+from utils.pipeline import run_pipeline
+from utils.workspace import Workspace
+from utils.telemetry import write_reports
+
+
+def job_workspace(root, index, topic):
+    """Stable per-topic directory, so re-running a topics file resumes unfinished jobs (their script is kept)"""
+    digest = hashlib.sha1(topic.encode('utf-8')).hexdigest()[:8]
+    return Workspace(Path(root) / f"{index:03d}-{digest}")
+
+def run_job(index, topic, workspace, regenerate_script=False):
+    started = time.perf_counter()
+    logging.info(f"[Job {index}] Starting '{topic}' in {workspace.root}")
+    result = {"index": index, "topic": topic, "workspace": str(workspace.root)}
+    try:
+        result["output"] = str(run_pipeline(topic, workspace, regenerate_script))
+        result["status"] = "done"
+        logging.info(f"[Job {index}] Done: {result['output']}")
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+        logging.error(f"[Job {index}] Failed: {str(e)}")
+    result["seconds"] = round(time.perf_counter() - started, 1)
+    write_reports(workspace, topic=topic, status=result["status"], seconds=result["seconds"])
+    return result
+
+def run_batch(topics, jobs=BATCH_JOBS, root=BATCH_DIR, regenerate_script=False):
+    """Run every topic in its own workspace, `jobs` at a time; writes batch_report.json to root"""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="job") as executor:
+        futures = [executor.submit(run_job, index, topic, job_workspace(root, index, topic), regenerate_script)
+                   for index, topic in enumerate(topics)]
+        for future in as_completed(futures):
+            results.append(future.result())
+    results.sort(key=lambda result: result["index"])
+
+    with open(root / "batch_report.json", 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    failed = sum(1 for result in results if result["status"] != "done")
+    logging.info(f"Batch finished: {len(results) - failed} done, {failed} failed "
+                 f"in {time.perf_counter() - started:.1f}s")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate one short per topic")
+    parser.add_argument("topics_file", help="text file with one topic per line")
+    parser.add_argument("-j", "--jobs", type=int, default=BATCH_JOBS, help="topics processed concurrently")
+    parser.add_argument("--root", type=Path, default=BATCH_DIR, help="directory for the job workspaces")
+    parser.add_argument("--regenerate-script", action="store_true",
+                        help="write new scripts instead of resuming the ones already in the workspaces")
+    args = parser.parse_args()
+
+    setup_logging()
+    results = run_batch(read_topics(args.topics_file), jobs=args.jobs, root=args.root,
+                        regenerate_script=args.regenerate_script)
+    return 0 if all(result["status"] == "done" for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# bench/media.py
+import subprocess
+from pathlib import Path
+
+from config import FFMPEG_BINARY
+
+CLIP_SIZE = (1080, 1920)  # Pexels' portrait HD rendition
+CLIP_SECONDS = 6
+AUDIO_SECONDS = range(1, 9)  # Narration lengths served by the TTS stand-in
+
+
+def _ffmpeg(*args):
+    subprocess.run([FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error", *args], check=True)
+
+def make_clips(media_dir, count):
+    """count visually distinct H.264 clips (test pattern at different hues), generated once per media_dir"""
+    clip_dir = Path(media_dir) / "clips"
+    clip_dir.mkdir(parents=True, exist_ok=True)
+    width, height = CLIP_SIZE
+    paths = []
+    for i in range(count):
+        path = clip_dir / f"clip{i:03d}.mp4"
+        if not path.exists():
+            tmp_path = path.with_suffix(".tmp.mp4")
+            _ffmpeg("-f", "lavfi", "-i", f"testsrc2=s={width}x{height}:r=30:d={CLIP_SECONDS}",
+                    "-vf", f"hue=h={i * 37 % 360}", "-c:v", "libx264", "-preset", "ultrafast",
+                    "-pix_fmt", "yuv420p", str(tmp_path))
+            tmp_path.replace(path)
+        paths.append(path)
+    return paths
+
+def make_narration(media_dir):
+    """{seconds: mp3 path} in ElevenLabs' mp3_22050_32 format"""
+    audio_dir = Path(media_dir) / "audio"
+    audio_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for seconds in AUDIO_SECONDS:
+        path = audio_dir / f"narration{seconds}.mp3"
+        if not path.exists():
+            tmp_path = path.with_suffix(".tmp.mp3")
+            _ffmpeg("-f", "lavfi", "-i", f"sine=f={200 + 40 * seconds}:d={seconds}",
+                    "-ar", "22050", "-ac", "1", "-b:a", "32k", str(tmp_path))
+            tmp_path.replace(path)
+        paths[seconds] = path
+    return paths
@@ -0,0 +1,194 @@
+"""Offline benchmarks: the whole pipeline against local stand-ins for every provider.
+
+    python -m bench.run                        # run and compare with bench/baseline.json
+    python -m bench.run --save-baseline        # record this machine's results as the baseline
+    python -m bench.run --lengths 4 8 --backend ffmpeg --tolerance 0.25
+    python -m bench.run --whole-script         # narrate each script in one request with timestamps
+
+Each script length runs main.py in a fresh scratch directory (outputs, caches and secrets are
+redirected with SHORTS_* variables): a cold run, a warm re-run of the same job (everything
+up to date) and the still-image stage. Exits with 1 when a metric regresses past the baseline.
+Peak RSS comes from wait4 on Linux/macOS; on Windows it is sampled with psutil when installed.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from config import BASE_DIR, OUTPUT_DIR, RENDER_BACKEND
+from bench.media import make_clips, make_narration
+from bench.stubs import StubServer, StubState, SEARCH_RESULTS
+from utils.ffprobe import probe_duration
+
+LENGTHS = (4, 8, 16)  # Script lines per scenario
+TOLERANCE = 0.2  # Allowed relative slowdown before a metric counts as regressed
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+WORK_DIR = OUTPUT_DIR / "bench"
+
+HIGHER_IS_BETTER = {"render_fps", "throughput"}
+# Absolute noise floor per unit, so tiny timings don't flap
+SLACK = {"seconds": 0.5, "rss_mb": 25}
+RSS_SAMPLE_INTERVAL = 0.1  # Seconds between memory samples where the OS can't report the peak
+
+
+def run_main(args, env, log_file):
+    """Run main.py with args; returns (exit code, peak RSS in MB or None when it can't be measured)"""
+    with open(log_file, "a", encoding="utf-8") as log:
+        process = subprocess.Popen([sys.executable, str(BASE_DIR / "main.py"), *args], cwd=BASE_DIR,
+                                   env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):  # POSIX: the kernel reports the peak when reaping the child
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is in KB on Linux, bytes on macOS
+            return process.returncode, usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        peak = sample_peak_rss(process)
+        return process.wait(), peak
+
+def sample_peak_rss(process):
+    """Peak memory of a running process in MB, polled with psutil (Windows has no wait4)"""
+    try:
+        import psutil
+    except ImportError:
+        logging.warning("psutil is not installed, peak RSS is not measured (pip install psutil)")
+        return None
+    peak = 0
+    try:
+        handle = psutil.Process(process.pid)
+        while process.poll() is None:
+            info = handle.memory_info()
+            peak = max(peak, getattr(info, "peak_wset", info.rss))  # Windows tracks its own peak
+            time.sleep(RSS_SAMPLE_INTERVAL)
+    except psutil.NoSuchProcess:
+        pass
+    return peak / (1024 * 1024) if peak else None
+
+def read_report(workspace):
+    with open(workspace / "run_report.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def gauge(report, name):
+    return next((metric["value"] for metric in report["metrics"]["gauges"] if metric["name"] == name), None)
+
+def run_scenario(lines, state, env, scratch):
+    """Cold run, warm re-run and image stage for one script length"""
+    if scratch.exists():
+        shutil.rmtree(scratch)
+    workspace = scratch / "job"
+    log_file = scratch / "bench.log"
+    scratch.mkdir(parents=True)
+    env = {**env, "SHORTS_OUTPUT_DIR": str(scratch / "outputs"), "SHORTS_CACHE_DIR": str(scratch / "cache")}
+    state.lines = lines
+    results = {}
+
+    def stage(name, *args):
+        started = time.perf_counter()
+        code, rss = run_main([*args, "--workspace", str(workspace)], env, log_file)
+        if code != 0:
+            raise RuntimeError(f"{name} run failed with exit code {code}, see {log_file}")
+        return time.perf_counter() - started, rss, read_report(workspace)
+
+    seconds, rss, report = stage("cold", "all", "--topic", f"bench {lines}")
+    totals = report["span_totals"]
+    video_seconds = probe_duration(workspace / "youtube_short.mp4")
+    results.update({
+        "cold_seconds": round(seconds, 3),
+        "startup_seconds": gauge(report, "startup_seconds"),
+        "script_seconds": totals.get("script", {}).get("seconds"),
+        "parts_seconds": totals.get("parts", {}).get("seconds"),
+        "render_seconds": totals.get("render", {}).get("seconds"),
+        "render_fps": gauge(report, "render_fps"),
+        "throughput": round(video_seconds / seconds, 3),  # Seconds of video per second of wall time
+        "peak_rss_mb": round(rss, 1) if rss is not None else None,
+    })
+
+    seconds, rss, report = stage("warm", "all", "--topic", f"bench {lines}")
+    results["warm_seconds"] = round(seconds, 3)
+    if rss is not None:
+        results["peak_rss_mb"] = max(results["peak_rss_mb"] or 0, round(rss, 1))
+
+    seconds, rss, report = stage("images", "media", "--images")
+    results["images_seconds"] = round(seconds, 3)
+    return results
+
+def compare(results, baseline, tolerance):
+    """List of (scenario, metric, baseline, value) past the tolerance"""
+    regressions = []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(scenario, {}).get(metric)
+            if base is None or value is None:
+                continue
+            slack = SLACK["rss_mb"] if metric.endswith("_mb") else SLACK["seconds"] if metric.endswith("_seconds") else 0
+            if metric in HIGHER_IS_BETTER:
+                regressed = value < base * (1 - tolerance)
+            else:
+                regressed = value > base * (1 + tolerance) and value - base > slack
+            if regressed:
+                regressions.append((scenario, metric, base, value))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks with local provider stand-ins")
+    parser.add_argument("--lengths", type=int, nargs="+", default=list(LENGTHS), help="script lines per scenario")
+    parser.add_argument("--backend", choices=["moviepy", "ffmpeg"], default=RENDER_BACKEND)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--whole-script", action="store_true", help="narrate each script in one timestamped request")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--work-dir", type=Path, default=WORK_DIR, help="scratch space (media is kept between runs)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    logging.info("Preparing synthetic media...")
+    media_dir = args.work_dir / "media"
+    clips = make_clips(media_dir, max(args.lengths) * SEARCH_RESULTS)
+    narration = make_narration(media_dir)
+
+    secrets_dir = args.work_dir / "secrets"
+    secrets_dir.mkdir(parents=True, exist_ok=True)
+    for name in ["gemini_secret.txt", "voice_secret.txt", "pexels_secret.txt"]:
+        (secrets_dir / name).write_text("bench", encoding="utf-8")
+
+    state = StubState(clips, narration)
+    results = {}
+    with StubServer(state) as server:
+        env = {**os.environ, **server.env(),
+               "SHORTS_SECRETS_DIR": str(secrets_dir),
+               "SHORTS_RENDER_BACKEND": args.backend,
+               "SHORTS_DEFAULT_RATE_LIMIT": "1000,1000",  # Measure the pipeline, not the provider quotas
+               "SHORTS_TTS_BACKEND": "elevenlabs",
+               "SHORTS_TTS_WHOLE_SCRIPT": "1" if args.whole_script else "0"}
+        for lines in args.lengths:
+            scenario = f"{args.backend}-lines{lines}" + ("-script" if args.whole_script else "")
+            logging.info(f"Running {scenario}...")
+            results[scenario] = run_scenario(lines, state, env, args.work_dir / scenario)
+            logging.info(f"{scenario}: {json.dumps(results[scenario])}")
+        logging.info(f"Stub requests: {json.dumps(state.requests)}")
+
+    with open(args.work_dir / "results.json", "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=1)
+
+    if args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+        logging.info(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        logging.warning(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+    for scenario, metric, base, value in regressions:
+        logging.error(f"Regression in {scenario}: {metric} {base} -> {value}")
+    if not regressions:
+        logging.info("No regressions against the baseline")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
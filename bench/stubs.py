@@ -0,0 +1,212 @@
+# bench/stubs.py
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import urlparse, parse_qs
+
+from PIL import Image
+
+SEARCH_RESULTS = 5
+PICTURES_PER_VIDEO = 3
+CHARS_PER_SECOND = 14  # Narration speed of the TTS stand-in
+LINE_PAUSE = 0.5  # Seconds of silence the stand-in leaves at each line break
+
+
+def script_markdown(lines, draft=1):
+    """A Gemini answer that create_line_by_line turns into exactly `lines` lines (the title is one).
+
+    Like Gemini, every request (draft) gets different wording, so a re-run that asks for a new script
+    can't look cached.
+    """
+    sentences = [f"الجملة رقم {i} من المسودة {draft} للموضوع." for i in range(1, lines)]  # Under the word limit
+    return f"# عنوان المسودة {draft}\n\n" + "\n".join(sentences)
+
+def noise_jpeg(seed, size=(160, 90)):
+    """Random still, so every stand-in video gets its own perceptual fingerprint"""
+    rng = random.Random(seed)
+    image = Image.frombytes("L", size, rng.randbytes(size[0] * size[1]))
+    buffer = BytesIO()
+    image.convert("RGB").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+class StubState:
+    """What the stand-ins serve; the harness sets `lines` before each scenario"""
+
+    def __init__(self, clips, narration):
+        self.lines = 4
+        self.clips = clips
+        self.narration = narration
+        self.lock = threading.Lock()
+        self.video_clips = {}  # Pexels video id -> clip file, first come first served
+        self.requests = {}  # route -> count
+
+    def clip_for(self, video_id):
+        with self.lock:
+            if video_id not in self.video_clips:
+                self.video_clips[video_id] = self.clips[len(self.video_clips) % len(self.clips)]
+            return self.video_clips[video_id]
+
+    def hit(self, route):
+        """Count a request; returns how many this route has had"""
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            return self.requests[route]
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Gemini, Google Translate, Pexels (search, stills, MP4s), ElevenLabs (with timestamps too) and
+    Pollinations on one port"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real providers
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def send_body(self, body, content_type, status=200, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_json(self, data):
+        self.send_body(json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.read_body()
+        if url.path.startswith("/gemini"):
+            draft = self.state.hit("gemini")
+            self.send_json({"candidates": [{"content": {"parts": [{"text": script_markdown(self.state.lines, draft)}]}}]})
+        elif re.fullmatch(r"/elevenlabs/v1/text-to-speech/[^/]+/with-timestamps", url.path):
+            self.state.hit("elevenlabs_timestamps")
+            self.send_json(self.tts_with_timestamps(json.loads(body or b"{}").get("text", "")))
+        elif url.path.startswith("/elevenlabs/v1/text-to-speech/"):
+            self.state.hit("elevenlabs")
+            self.send_tts(json.loads(body or b"{}").get("text", ""))
+        else:
+            self.send_error(404)
+
+    def send_tts(self, text):
+        """Canned narration, as long as the text would take to read"""
+        seconds = min(max(1, round(len(text) / CHARS_PER_SECOND)), max(self.state.narration))
+        self.send_body(self.state.narration[seconds].read_bytes(), "audio/mpeg")
+
+    def tts_with_timestamps(self, text):
+        """Canned alignment (steady speed, a pause per line break) over canned narration long enough for it"""
+        starts, ends = [], []
+        clock = 0.0
+        for char in text:
+            starts.append(round(clock, 3))
+            clock += LINE_PAUSE if char == "\n" else 1 / CHARS_PER_SECOND
+            ends.append(round(clock, 3))
+        # MP3 frames concatenate, so whole canned files are joined until they cover the speech
+        audio = b""
+        remaining = max(1, round(clock + 0.5))
+        while remaining > 0:
+            seconds = min(remaining, max(self.state.narration))
+            audio += self.state.narration[seconds].read_bytes()
+            remaining -= seconds
+        alignment = {"characters": list(text), "character_start_times_seconds": starts,
+                     "character_end_times_seconds": ends}
+        return {"audio_base64": base64.b64encode(audio).decode("ascii"), "alignment": alignment,
+                "normalized_alignment": alignment}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if url.path == "/translate":
+            self.state.hit("translate")
+            lines = query.get("q", "").split("\n")
+            translated = "\n".join(f"scene {hashlib.sha1(line.encode('utf-8')).hexdigest()[:8]}" for line in lines)
+            self.send_json([[[translated, query.get("q", ""), None, None]]])
+        elif url.path == "/pexels/search":
+            self.state.hit("pexels_search")
+            self.send_json({"videos": self.search_results(query)})
+        elif url.path.startswith("/pexels/pictures/"):
+            self.state.hit("pexels_pictures")
+            self.send_body(noise_jpeg(url.path), "image/jpeg")
+        elif match := re.fullmatch(r"/pexels/videos/(\d+)\.mp4", url.path):
+            self.state.hit("pexels_videos")
+            self.send_file(self.state.clip_for(int(match[1])))
+        elif url.path.startswith("/pollinations/"):
+            self.state.hit("pollinations")
+            self.send_body(noise_jpeg(url.path, size=(512, 512)), "image/jpeg")
+        else:
+            self.send_error(404)
+
+    def search_results(self, query):
+        base = f"http://{self.headers['Host']}/pexels"
+        seed = int(hashlib.sha1(query.get("query", "").encode("utf-8")).hexdigest()[:8], 16)
+        videos = []
+        for i in range(int(query.get("per_page", SEARCH_RESULTS))):
+            video_id = seed * 100 + i
+            videos.append({
+                "id": video_id,
+                "duration": 6,
+                "video_files": [{"link": f"{base}/videos/{video_id}.mp4", "width": 1080, "height": 1920,
+                                 "file_type": "video/mp4", "quality": "hd"}],
+                "video_pictures": [{"picture": f"{base}/pictures/{video_id}/{k}.jpg"}
+                                   for k in range(PICTURES_PER_VIDEO)],
+            })
+        return videos
+
+    def send_file(self, path):
+        """Serve a file with single-range support, as the clip downloader resumes with Range"""
+        data = path.read_bytes()
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if not match:
+            self.send_body(data, "video/mp4", headers={"Accept-Ranges": "bytes"})
+            return
+        start = int(match[1])
+        if start >= len(data):
+            self.send_body(b"", "video/mp4", status=416, headers={"Content-Range": f"bytes */{len(data)}"})
+            return
+        self.send_body(data[start:], "video/mp4", status=206,
+                       headers={"Content-Range": f"bytes {start}-{len(data) - 1}/{len(data)}"})
+
+class StubServer:
+    """Every provider stand-in on one local port, served from a background thread"""
+
+    def __init__(self, state, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = state
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """SHORTS_* variables pointing the pipeline at this server"""
+        return {
+            "SHORTS_GEMINI_API_URL": f"{self.url}/gemini",
+            "SHORTS_TRANSLATE_URL": f"{self.url}/translate",
+            "SHORTS_PEXELS_API_URL": f"{self.url}/pexels/search",
+            "SHORTS_POLLINATIONS_URL": f"{self.url}/pollinations/",
+            "SHORTS_ELEVENLABS_BASE_URL": f"{self.url}/elevenlabs",
+        }
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -5,17 +5,40 @@ from pathlib import Path
 IMAGEMAGICK_BINARY = os.path.join(r"C:\ImageMagick\magick.exe")
 
 
+# Paths, provider URLs and the default rate limit can be redirected with SHORTS_* environment
+# variables (the benchmark suite points them at a scratch directory and local stub servers)
+def _env(name, default):
+    return os.environ.get(f"SHORTS_{name}", default)
+
 # Base directories
 BASE_DIR = Path(__file__).parent
-OUTPUT_DIR = BASE_DIR / "outputs"
+OUTPUT_DIR = Path(_env("OUTPUT_DIR", BASE_DIR / "outputs"))
 AUDIO_DIR = OUTPUT_DIR / "audio"
 IMAGE_DIR = OUTPUT_DIR / "images"
 VIDEO_CLIP_DIR = OUTPUT_DIR / "video_clips"  # New directory for video clips
+CACHE_DIR = Path(_env("CACHE_DIR", BASE_DIR / "cache"))  # Caches shared by every run
+TRANSLATION_CACHE_FILE = CACHE_DIR / "translations.sqlite"
+PEXELS_CACHE_FILE = CACHE_DIR / "pexels_search.sqlite"
+ASSET_DIR = CACHE_DIR / "assets"  # Content-addressed blobs, part files link into it
+ASSET_INDEX_FILE = CACHE_DIR / "assets.sqlite"
+SEGMENT_CACHE_DIR = CACHE_DIR / "segments"  # Rendered segments keyed by a hash of their inputs
+CAPTION_CACHE_DIR = CACHE_DIR / "captions"  # Caption rasters keyed by text, font, size and style
+FINGERPRINT_FILE = CACHE_DIR / "fingerprints.sqlite"  # Frame hashes of every downloaded Pexels video
+TTS_CACHE_FILE = CACHE_DIR / "tts.sqlite"  # Narration key (text, voice, model, settings, format) -> asset
 
 # API Configuration
-GEMINI_API_KEY_FILE = BASE_DIR / "gemini_secret.txt"
-ELEVENLABS_API_KEY_FILE = BASE_DIR / "voice_secret.txt"
-PEXELS_API_KEY_FILE = BASE_DIR / "pexels_secret.txt"  # New Pexels API key
+SECRETS_DIR = Path(_env("SECRETS_DIR", BASE_DIR))
+GEMINI_API_KEY_FILE = SECRETS_DIR / "gemini_secret.txt"
+ELEVENLABS_API_KEY_FILE = SECRETS_DIR / "voice_secret.txt"
+PEXELS_API_KEY_FILE = SECRETS_DIR / "pexels_secret.txt"  # New Pexels API key
+
+# Provider endpoints
+GEMINI_API_URL = _env("GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta/models/"
+                                        "gemini-1.5-flash-latest:generateContent")
+TRANSLATE_URL = _env("TRANSLATE_URL", "https://translate.googleapis.com/translate_a/single")
+PEXELS_API_URL = _env("PEXELS_API_URL", "https://api.pexels.com/videos/search")
+POLLINATIONS_URL = _env("POLLINATIONS_URL", "https://image.pollinations.ai/prompt/")
+ELEVENLABS_BASE_URL = _env("ELEVENLABS_BASE_URL", None)  # None = the SDK's default
 
 # Video Settings
 VIDEO_RESOLUTION = (1080, 1920)  # Vertical/Short format
@@ -23,6 +46,42 @@ VIDEO_FPS = 30
 FONT_FILE = BASE_DIR / "font.ttf"  # Default font path
 MAX_CLIP_DURATION = 8  # Maximum duration per clip in seconds
 MIN_CLIP_DURATION = 3  # Minimum duration per clip in seconds
+FALLBACK_COLORS = [  # Backgrounds for parts without a usable clip
+    (40, 40, 40),   # Dark gray
+    (10, 20, 30),   # Dark blue
+    (30, 10, 10)    # Dark red
+]
+
+# Captions (rasterized once with Pillow, shared by both render backends)
+CAPTION_FONT_SIZE = 70
+CAPTION_MAX_WIDTH = 1000  # Text wraps to this many pixels
+CAPTION_STYLE = {
+    "color": (255, 255, 255),
+    "stroke_color": (0, 0, 0),
+    "stroke_width": 2,
+    "box_color": (0, 0, 0),
+    "box_opacity": 0.6,
+    "padding": (20, 10),
+    "line_spacing": 10,
+}
+
+# Rendering
+RENDER_BACKEND = _env("RENDER_BACKEND", "moviepy")  # "moviepy" or "ffmpeg" (single filter_complex run, much faster)
+FFMPEG_BINARY = _env("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = _env("FFPROBE_BINARY", "ffprobe")
+RENDER_VIDEO_CODEC = "libx264"
+RENDER_PRESET = "medium"
+RENDER_CRF = 20
+RENDER_AUDIO_BITRATE = "128k"
+RENDER_WORKERS = None  # Segment render processes, None = one per CPU core
+
+# Clip normalization (right after download, so renders read pre-conformed clips)
+NORMALIZE_CLIPS = True
+NORMALIZE_WORKERS = 2
+NORMALIZE_MAX_DURATION = 12  # Seconds kept; longer than any narrated line
+NORMALIZE_GOP = VIDEO_FPS  # One keyframe per second
+NORMALIZE_CRF = 18  # Near-lossless, it gets encoded again at render time
+NORMALIZE_PRESET = "veryfast"
 
 # ElevenLabs Settings
 VOICE_ID = "pNInz6obpgDQGcFmaJgB"  # Default voice
@@ -33,6 +92,67 @@ VOICE_SETTINGS = {
     "use_speaker_boost": True
 }
 
-# Create directories if they don't exist
-for directory in [OUTPUT_DIR, AUDIO_DIR, IMAGE_DIR, VIDEO_CLIP_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
+# Text to speech
+TTS_BACKEND = _env("TTS_BACKEND", "elevenlabs")  # "elevenlabs" or "local" (offline pyttsx3, see below)
+LOCAL_TTS_WORKERS = None  # Engine processes for the local backend, None = one per CPU core
+LOCAL_TTS_RATE = 150  # Words per minute
+LOCAL_TTS_VOLUME = 0.9  # 0-1
+LOCAL_TTS_VOICE = None  # pyttsx3 voice id (pick one that speaks the script's language), None = system default
+TTS_CACHE_MAX_BYTES = 500 * 1024 * 1024  # Least recently used narration is evicted past this, None = unbounded
+# Narrate the script in one request with character timestamps and cut it into parts, instead of one
+# request per line (fewer round trips, and one lead-in/trailing silence instead of one per line)
+TTS_WHOLE_SCRIPT = _env("TTS_WHOLE_SCRIPT", "0") == "1"
+SCRIPT_TTS_MAX_CHARS = 5000  # Characters per request (ElevenLabs caps text length per model)
+SCRIPT_TTS_PADDING = 0.15  # Seconds kept before the first and after the last spoken character
+
+# Pexels search cache
+PEXELS_CACHE_TTL = 7 * 24 * 3600  # Seconds before a cached search is asked again
+PEXELS_CACHE_MAX_ENTRIES = 5000
+
+RENDITION_MAX_UPSCALE = 1.5  # Renditions needing more upscaling than this to fill the frame are skipped
+
+# Near-duplicate clip detection
+FINGERPRINT_FRAMES = 6  # Preview stills hashed per candidate video
+FINGERPRINT_MAX_DISTANCE = 10  # Bits (of 64) two frame hashes may differ and still match
+FINGERPRINT_MIN_MATCH_RATIO = 0.5  # Share of frames that must match to call it a duplicate
+
+# HTTP client (shared by every provider)
+HTTP_TIMEOUT = (5, 30)  # Connect, read seconds
+HTTP_RETRIES = 3  # Retries on 429, plus 5xx, connection errors and timeouts for idempotent methods
+HTTP_BACKOFF = 0.5  # Exponential backoff factor in seconds
+HTTP_MAX_RETRY_AFTER = 60  # Seconds a Retry-After may ask for; a longer wait gives up and returns the response
+HTTP_POOL_SIZE = 16  # Keep-alive connections per host
+
+# Concurrency / rate limiting
+CLIP_WORKERS = 4  # Parallel clip acquisitions in generate_video_clips
+DOWNLOAD_ATTEMPTS = 3  # Interrupted clip downloads resume with a Range request
+RATE_LIMITS = {  # host -> (requests per second, burst)
+    "api.pexels.com": (2, 2),
+    "videos.pexels.com": (4, 4),
+    "images.pexels.com": (10, 10),
+    "translate.googleapis.com": (5, 5),
+    "image.pollinations.ai": (1, 1),
+}
+DEFAULT_RATE_LIMIT = tuple(map(float, _env("DEFAULT_RATE_LIMIT", "5,5").split(",")))  # Unlisted hosts
+VOICE_WORKERS = 3  # Concurrent ElevenLabs requests (keep within your plan's concurrency limit)
+VOICE_CHARACTER_QUOTA = (50, 1000)  # ElevenLabs characters per second, burst
+SEGMENT_WORKERS = 2  # Segments prepared for rendering while other parts are still fetching
+
+# Batch runs (batch.py)
+BATCH_DIR = OUTPUT_DIR / "jobs"  # One workspace per topic under here
+BATCH_JOBS = 2  # Topics in flight at once; they share caches, rate limits and the render pool
+
+# Telemetry: every run writes run_report.json into its workspace and refreshes this textfile
+# (point it into node_exporter's --collector.textfile.directory to scrape it)
+METRICS_FILE = OUTPUT_DIR / "metrics.prom"
+
+# Render worker (worker.py): a long-lived process fed through a SQLite job queue
+WORKER_DIR = OUTPUT_DIR / "worker"  # Job workspaces, one per job id
+JOB_QUEUE_FILE = WORKER_DIR / "jobs.sqlite"
+WORKER_JOBS = BATCH_JOBS  # Jobs the worker runs at once
+WORKER_POLL_INTERVAL = 2  # Seconds between queue checks when idle
+
+def ensure_dirs():
+    """Create the output and cache directories (called by the entry points, not on import)"""
+    for directory in [OUTPUT_DIR, AUDIO_DIR, IMAGE_DIR, VIDEO_CLIP_DIR, CACHE_DIR, ASSET_DIR]:
+        directory.mkdir(parents=True, exist_ok=True)
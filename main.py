@@ -1,9 +1,10 @@
-from utils.script_writer import generate_script
-#from utils.image_gen import generate_images
-from utils.video_clip_gen import generate_video_clips as generate_media
-from utils.voice_gen import generate_voices
-from utils.video_creation import create_video
-from config import OUTPUT_DIR
+import time
+STARTED = time.perf_counter()  # Before any other import, so startup cost shows up in the log
+
+import argparse
+from config import OUTPUT_DIR, RENDER_BACKEND, ensure_dirs
+from utils.workspace import Workspace, DEFAULT_WORKSPACE
+from utils.telemetry import get_telemetry, write_reports
 import logging
 import os
 #FFMPEG_BINARY = r"C:\Program Files\ffmpeg-7.1-full_build\bin\ffmpeg.exe"
@@ -11,6 +12,7 @@ import os
 os.environ["IMAGEMAGICK_BINARY"] =  r"C:\Program Files\ImageMagick\magick.exe"
 
 def setup_logging():
+    ensure_dirs()
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s',
@@ -20,33 +22,79 @@ def setup_logging():
         ]
     )
 
-def main():
+# Each stage imports only what it needs, so re-running one stage stays cheap
+
+def run_all(args, workspace):
+    # Script first, then clips + voiceovers per line in parallel, segments as their inputs land
+    from utils.pipeline import run_pipeline
+    return run_pipeline(args.topic, workspace, regenerate_script=args.regenerate_script)
+
+def run_script(args, workspace):
+    from utils.script_writer import generate_script
+    return generate_script(args.topic, workspace)
+
+def run_media(args, workspace):
+    from utils.video_clip_gen import generate_video_clips
+    generate_video_clips(workspace=workspace)
+    if args.images:
+        from utils.image_gen import generate_images
+        generate_images(workspace)
+    return workspace.video_clip_dir
+
+def run_voice(args, workspace):
+    from utils.voice_gen import generate_voices
+    generate_voices(workspace=workspace)
+    return workspace.audio_dir
+
+def run_render(args, workspace):
+    from utils.renderers import get_renderer
+    return get_renderer(args.backend).create_video(workspace=workspace)
+
+STAGES = {
+    "all": run_all,
+    "script": run_script,
+    "media": run_media,
+    "voice": run_voice,
+    "render": run_render,
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a YouTube short, or re-run one stage of it")
+    parser.add_argument("stage", nargs="?", default="all", choices=STAGES,
+                        help="stage to run (default: all)")
+    parser.add_argument("--topic", help="script topic (asked for when missing)")
+    parser.add_argument("--workspace", type=Workspace, default=DEFAULT_WORKSPACE,
+                        help="job directory (default: outputs/)")
+    parser.add_argument("--regenerate-script", action="store_true",
+                        help="all: write a new script even if the workspace has one for this topic")
+    parser.add_argument("--images", action="store_true", help="media: also generate still images")
+    parser.add_argument("--backend", choices=["moviepy", "ffmpeg"], default=RENDER_BACKEND,
+                        help="render: backend to use")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     setup_logging()
-    logging.info("Starting video generation process")
-    
+    workspace = args.workspace.create()
+    startup = time.perf_counter() - STARTED
+    get_telemetry().gauge("startup_seconds", round(startup, 3), stage=args.stage)
+    logging.info(f"Starting stage '{args.stage}' (startup took {startup:.2f}s)")
+
+    status = "failed"
     try:
-        # Step 1: Generate script/content
-        logging.info("Generating script content...")
-        script_path = generate_script()
-        
-        # Step 2: Generate images
-        logging.info("Generating images...")
-        generate_media()
-        
-        # Step 3: Generate voiceovers
-        logging.info("Generating voiceovers...")
-        generate_voices()
-        
-        # Step 4: Create final video
-        logging.info("Creating final video...")
-        video_path = create_video()
-        
-        logging.info(f"Video generation complete! Output: {video_path}")
-        return video_path
-        
+        with get_telemetry().span("stage", workspace.root, stage=args.stage):
+            result = STAGES[args.stage](args, workspace)
+
+        status = "done"
+        logging.info(f"Stage '{args.stage}' complete in {time.perf_counter() - STARTED:.1f}s! Output: {result}")
+        return result
+
     except Exception as e:
-        logging.error(f"Video generation failed: {str(e)}")
+        logging.error(f"Stage '{args.stage}' failed: {str(e)}")
         raise
 
+    finally:
+        write_reports(workspace, stage=args.stage, status=status, seconds=round(time.perf_counter() - STARTED, 3))
+
 if __name__ == "__main__":
     main()
@@ -1,7 +1,7 @@
 from moviepy.editor import TextClip
-from config import font
+from config import FONT_FILE
 try:
-    test = TextClip(txt="Test", fontsize=70, color='white', font=font.ttf)
+    test = TextClip(txt="Test", fontsize=70, color='white', font=str(FONT_FILE))
     print("Font works!")
 except Exception as e:
     print(f"Font error: {str(e)}")
@@ -0,0 +1,12 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Outputs, caches and secrets go to a scratch directory; config reads these on import
+_scratch = Path(tempfile.mkdtemp(prefix="shorts_tests_"))
+for name in ["OUTPUT_DIR", "CACHE_DIR", "SECRETS_DIR"]:
+    os.environ[f"SHORTS_{name}"] = str(_scratch / name.lower())
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,65 @@
+# tests/test_clip_moves.py
+import hashlib
+import random
+
+import pytest
+
+import utils.video_clip_gen as video_clip_gen
+from utils.fingerprint import FingerprintIndex
+from utils.video_clip_gen import ClipRun, DuplicateVideoError, acquire_clip
+from utils.workspace import Workspace
+
+
+@pytest.fixture
+def pexels(tmp_path, monkeypatch):
+    """Offline search and download: a line's first word picks its video; counts downloads"""
+    downloads = []
+    index = FingerprintIndex(tmp_path / "fingerprints.sqlite")
+
+    def search_pexels_video(prompt, accept=None):
+        video = {"id": prompt.split()[0]}
+        if accept is not None and not accept(video):
+            raise DuplicateVideoError("All suitable videos are duplicates")
+        return f"https://videos.example/{video['id']}.mp4"
+
+    def download_video_clip(url, save_path):
+        downloads.append(url)
+        save_path.write_bytes(url.encode("utf-8"))
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def fingerprint_pexels_video(video):
+        rng = random.Random(video["id"])
+        return [rng.getrandbits(64) for _ in range(4)]
+
+    monkeypatch.setattr(video_clip_gen, "get_fingerprint_index", lambda: index)
+    monkeypatch.setattr(video_clip_gen, "translate_to_english", lambda text: text)
+    monkeypatch.setattr(video_clip_gen, "search_pexels_video", search_pexels_video)
+    monkeypatch.setattr(video_clip_gen, "download_video_clip", download_video_clip)
+    monkeypatch.setattr(video_clip_gen, "fingerprint_pexels_video", fingerprint_pexels_video)
+    return downloads
+
+def fetch_all(workspace, lines):
+    workspace.line_file.write_text("\n".join(lines), encoding="utf-8")
+    run = ClipRun(workspace)
+    paths = [acquire_clip(part, line, run) for part, line in enumerate(lines)]
+    return [path.read_bytes() if path else None for path in paths]
+
+def test_moved_sentences_keep_their_clips(tmp_path, pexels):
+    workspace = Workspace(tmp_path / "job").create()
+    before = fetch_all(workspace, ["alpha one", "beta two", "gamma three"])
+    assert len(pexels) == 3
+
+    # A line inserted at the top shifts every part: only the new one is downloaded
+    after = fetch_all(workspace, ["delta zero", "alpha one", "beta two", "gamma three"])
+    assert len(pexels) == 4
+    assert after[1:] == before
+    assert after[0] == b"https://videos.example/delta.mp4"
+
+def test_edited_sentence_can_get_its_own_footage_back(tmp_path, pexels):
+    workspace = Workspace(tmp_path / "job").create()
+    fetch_all(workspace, ["alpha one", "beta two"])
+
+    # The old sentence left the script, so its video is no longer a duplicate
+    after = fetch_all(workspace, ["alpha one, edited", "beta two"])
+    assert after == [b"https://videos.example/alpha.mp4", b"https://videos.example/beta.mp4"]
+    assert len(pexels) == 3
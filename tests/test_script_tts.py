@@ -0,0 +1,110 @@
+# tests/test_script_tts.py
+import pytest
+
+import utils.voice_gen as voice_gen
+from utils.manifest import artifact_key
+from utils.voice_gen import _request_batches, script_voice_key, split_times, synthesize_script
+from utils.workspace import Workspace
+
+
+def canned_alignment(lines, lead_in=0.5, char=0.1, pause=0.4):
+    """Character timestamps for "\\n".join(lines): char seconds per character, pause seconds per newline"""
+    alignment = {"characters": [], "starts": [], "ends": []}
+    t = lead_in
+    for character in "\n".join(lines):
+        length = pause if character == "\n" else char
+        alignment["characters"].append(character)
+        alignment["starts"].append(t)
+        alignment["ends"].append(t + length)
+        t += length
+    return alignment
+
+def flatten(times):
+    return [t for span in times for t in span]
+
+def test_cuts_fall_halfway_through_the_pauses():
+    times = split_times(["ab", "c d"], canned_alignment(["ab", "c d"]), padding=0.15)
+    # "ab" is spoken 0.5-0.7, the newline pause runs to 1.1, "c d" is spoken 1.1-1.4
+    assert flatten(times) == pytest.approx(flatten([(0.35, 0.9), (0.9, 1.55)]))
+
+def test_padding_never_starts_before_the_audio():
+    times = split_times(["ab"], canned_alignment(["ab"]), padding=1.0)
+    assert flatten(times) == pytest.approx(flatten([(0.0, 1.7)]))
+
+def test_surrounding_spaces_are_not_speech():
+    times = split_times([" ab ", "c"], canned_alignment([" ab ", "c"]), padding=0)
+    # " ab " spans 0.5-0.9 but is only spoken 0.6-0.8; the pause and the trailing space end at 1.3
+    assert flatten(times) == pytest.approx(flatten([(0.6, 1.05), (1.05, 1.4)]))
+
+def test_alignment_for_other_text_is_rejected():
+    with pytest.raises(ValueError):
+        split_times(["ab", "cd"], canned_alignment(["ab", "ce"]))
+
+def test_request_batches_join_changed_lines_across_gaps(monkeypatch):
+    monkeypatch.setattr(voice_gen, "SCRIPT_TTS_MAX_CHARS", 7)
+    lines = ["aa", "bb", "cc", "dd", "ee"]
+    assert _request_batches(lines, [1, 3]) == [[1, 3]]
+    assert _request_batches(lines, [0, 1, 2, 4]) == [[0, 1], [2, 4]]
+
+
+class FakeTTS:
+    name = "fake"
+    workers = 1
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.lines = []
+
+    def key(self, sentence):
+        return artifact_key(text=sentence, engine=self.engine)
+
+    def synthesize(self, sentence, audio_path):
+        self.lines.append(sentence)
+        audio_path.write_bytes(f"line:{sentence}".encode("utf-8"))
+        return audio_path.stat().st_size
+
+class FakeScriptTTS(FakeTTS):
+    def __init__(self, engine, alignment=canned_alignment):
+        super().__init__(engine)
+        self.alignment = alignment
+        self.requests = []
+
+    def synthesize_with_timestamps(self, text, audio_path):
+        self.requests.append(text)
+        audio_path.write_bytes(text.encode("utf-8"))
+        return self.alignment(text.split("\n"))
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    def split_audio(source, times, targets):  # No ffmpeg: each part gets its cut points
+        for (start, end), target in zip(times, targets):
+            target.write_bytes(f"cut:{start:.2f}-{end:.2f}".encode("utf-8"))
+
+    monkeypatch.setattr(voice_gen, "split_audio", split_audio)
+    return Workspace(tmp_path / "job").create()
+
+def test_script_is_narrated_in_one_request_and_cut(workspace):
+    backend = FakeScriptTTS("script-once")
+    lines = ["ab", "c d"]
+    assert synthesize_script(backend, lines, workspace) == 2
+    assert backend.requests == ["ab\nc d"] and backend.lines == []
+    audio = [workspace.audio_dir / f"part{i}.mp3" for i in range(2)]
+    assert [path.read_bytes() for path in audio] == [b"cut:0.35-0.90", b"cut:0.90-1.55"]
+    for path, line in zip(audio, lines):
+        assert workspace.manifest.is_fresh(path, script_voice_key(backend, line))
+
+    # Nothing changed, nothing is sent again
+    assert synthesize_script(backend, lines, workspace) == 0
+    assert len(backend.requests) == 1
+
+def test_mismatched_alignment_falls_back_to_one_request_per_line(workspace):
+    backend = FakeScriptTTS("script-mismatch", alignment=lambda lines: canned_alignment(["x"]))
+    assert synthesize_script(backend, ["ab", "cd"], workspace) == 2
+    assert backend.lines == ["ab", "cd"]
+    assert (workspace.audio_dir / "part1.mp3").read_bytes() == b"line:cd"
+
+def test_backend_without_timestamps_narrates_line_by_line(workspace):
+    backend = FakeTTS("no-timestamps")
+    assert synthesize_script(backend, ["ab", "cd"], workspace) == 2
+    assert backend.lines == ["ab", "cd"]
+    assert workspace.manifest.is_fresh(workspace.audio_dir / "part0.mp3", backend.key("ab"))
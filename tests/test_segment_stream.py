@@ -0,0 +1,46 @@
+# tests/test_segment_stream.py
+import pytest
+
+import utils.segment_cache as segment_cache
+from utils.segment_cache import SegmentStream
+
+rendered = []
+
+def render_one(segment, output_path, threads):
+    rendered.append(segment["part"])
+    output_path.write_bytes(repr(segment["video_path"]).encode("utf-8"))
+
+@pytest.fixture
+def stream(tmp_path, monkeypatch):
+    rendered.clear()
+    monkeypatch.setattr(segment_cache, "SEGMENT_CACHE_DIR", tmp_path / "segments")
+    monkeypatch.setattr(segment_cache, "render_workers", lambda: 1)  # Render in this process
+    return SegmentStream(3, "test", render_one)
+
+def segment(part, video_path=None, video_hash=None):
+    return {"part": part, "text": f"line {part}", "duration": 1.0, "audio_path": None,
+            "video_path": video_path, "video_hash": video_hash}
+
+def test_segments_render_as_soon_as_duplicates_are_ruled_out(tmp_path, stream):
+    clip = tmp_path / "clip.mp4"
+    clip.write_bytes(b"clip")
+
+    stream.add(segment(2))  # No clip, nothing to wait for
+    assert rendered == [2]
+    stream.add(segment(1, clip, "same"))  # Part 0 may use the same clip
+    assert rendered == [2]
+    stream.add(segment(0, clip, "same"))
+    assert rendered == [2, 0, 1]
+
+    paths = stream.paths()
+    assert [path.read_bytes() for path in paths] == [repr(clip).encode("utf-8"), b"None", b"None"]
+
+def test_a_known_earlier_duplicate_settles_a_part_early(tmp_path, stream):
+    clip = tmp_path / "clip.mp4"
+    clip.write_bytes(b"clip")
+
+    stream.add(segment(1, clip, "same"))
+    stream.add(segment(2, clip, "same"))  # Part 1 has it, so part 2 loses it whatever part 0 is
+    assert rendered == [2]
+    with pytest.raises(ValueError):
+        stream.paths()
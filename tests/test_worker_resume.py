@@ -0,0 +1,115 @@
+# tests/test_worker_resume.py
+import hashlib
+
+import pytest
+
+import utils.pipeline as pipeline
+import utils.script_writer as script_writer
+import utils.video_clip_gen as video_clip_gen
+from utils.job_queue import JobQueue
+from utils.manifest import artifact_key, clip_key
+from utils.workspace import Workspace
+from worker import Worker
+
+
+class Crash(BaseException):
+    """Stands in for the worker process dying mid-job (run_job only catches Exception)"""
+
+class FakeTTS:
+    name = "fake"
+    workers = 2
+
+    def __init__(self):
+        self.calls = 0
+
+    def key(self, sentence):
+        return artifact_key(text=sentence, engine="fake")
+
+    def synthesize(self, sentence, audio_path):
+        self.calls += 1
+        audio_path.write_bytes(sentence.encode("utf-8"))
+        return audio_path.stat().st_size
+
+class FakeStream:
+    def __init__(self):
+        self.segments = []
+
+    def add(self, segment):
+        self.segments.append(segment)
+
+class FakeRenderer:
+    def __init__(self):
+        self.crash = True
+
+    def prepare_segment(self, part, text, workspace=None):
+        return {"part": part, "text": text}
+
+    def render_stream(self, count):
+        return FakeStream()
+
+    def create_video(self, segments=None, workspace=None, stream=None):
+        if self.crash:
+            raise Crash()
+        workspace.output_video.write_bytes(b"video")
+        return workspace.output_video
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Offline Gemini, translation, Pexels and TTS, counting their calls"""
+    calls = {"gemini": 0, "downloads": 0}
+
+    def generate_content(prompt):
+        calls["gemini"] += 1  # Every call writes a different script, as Gemini does
+        return f"# عنوان رقم {calls['gemini']}\n\nجملة أولى {calls['gemini']}. جملة ثانية {calls['gemini']}."
+
+    def download_video_clip(url, save_path):
+        calls["downloads"] += 1
+        save_path.write_bytes(url.encode("utf-8"))
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    tts = FakeTTS()
+    renderer = FakeRenderer()
+    monkeypatch.setattr(script_writer, "generate_content", generate_content)
+    monkeypatch.setattr(video_clip_gen, "translate_to_english", lambda text: f"scene {text}")
+    monkeypatch.setattr(video_clip_gen, "search_pexels_video",
+                        lambda prompt, accept=None: f"https://videos.example/{prompt}.mp4")
+    monkeypatch.setattr(video_clip_gen, "download_video_clip", download_video_clip)
+    monkeypatch.setattr(pipeline, "translate_batch", lambda lines: None)
+    monkeypatch.setattr(pipeline, "fetch_clip", video_clip_gen.acquire_clip)  # No background normalization
+    monkeypatch.setattr(pipeline, "get_tts_backend", lambda: tts)
+    monkeypatch.setattr(pipeline, "get_renderer", lambda: renderer)
+    return calls, tts, renderer
+
+def test_requeued_job_keeps_finished_parts(tmp_path, providers):
+    calls, tts, renderer = providers
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    job_id = queue.submit("موضوع تجريبي")
+    worker = Worker(queue, jobs=1, root=tmp_path / "jobs")
+
+    job = queue.claim()
+    with pytest.raises(Crash):
+        worker.run(job)
+    assert queue.get(job_id)["status"] == "running"
+
+    workspace = Workspace(tmp_path / "jobs" / f"{job_id:06d}")
+    lines = workspace.read_lines()
+    assert len(lines) == 3
+    synthesized, downloaded = tts.calls, calls["downloads"]
+    assert synthesized == downloaded == 3
+
+    # A new worker on the same queue picks the job up again
+    renderer.crash = False
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    assert queue.requeue_running() == 1
+    job = queue.claim()
+    assert job["id"] == job_id
+    Worker(queue, jobs=1, root=tmp_path / "jobs").run(job)
+
+    assert queue.get(job_id)["status"] == "done"
+    assert calls["gemini"] == 1
+    assert workspace.read_lines() == lines
+    assert (tts.calls, calls["downloads"]) == (synthesized, downloaded)
+    manifest = Workspace(workspace.root).manifest
+    for part, text in enumerate(lines):
+        assert manifest.is_fresh(workspace.audio_dir / f"part{part}.mp3", tts.key(text))
+        assert manifest.is_fresh(workspace.video_clip_dir / f"part{part}.mp4", clip_key(text))
@@ -0,0 +1,91 @@
+# utils/asset_store.py
+import logging
+import os
+import shutil
+import threading
+import time
+
+from config import ASSET_DIR, ASSET_INDEX_FILE
+from utils.cache import SqliteCache
+from utils.file_hash import hash_file, get_hash_index
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    """digest -> {"ext", "size", "source", "stored"} for every blob in the store"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SqliteCache(ASSET_INDEX_FILE, table="assets")
+        return _index
+
+def blob_path(digest, ext=""):
+    return ASSET_DIR / digest[:2] / f"{digest}{ext}"
+
+def put_file(path, source=None, digest=None):
+    """Move a finished file into the store and return its digest.
+
+    Pass digest when it is already known (e.g. hashed while downloading) to skip re-reading the file.
+    If the same content is already stored the incoming copy is dropped, so each asset exists once.
+    """
+    digest = digest or hash_file(path)
+    ext = os.path.splitext(str(path))[1]
+    blob = blob_path(digest, ext)
+    if blob.exists():
+        os.unlink(path)
+    else:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, blob)
+    get_index().set(digest, {
+        "ext": ext,
+        "size": blob.stat().st_size,
+        "source": source,
+        "stored": time.time(),
+    })
+    return digest
+
+def link_file(src, target, symlink=True):
+    """Point target at src's content without copying: hardlink, else symlink, else copy.
+
+    Pass symlink=False when src may be deleted later (a hardlink or copy outlives it, a symlink dangles).
+    """
+    if os.path.lexists(target):
+        os.unlink(target)
+    try:
+        os.link(src, target)
+        return
+    except OSError:
+        pass
+    if symlink:
+        try:
+            os.symlink(os.path.realpath(src), target)
+            return
+        except OSError as e:
+            logging.warning(f"Could not link {target} to {src}, copying instead: {e}")
+    shutil.copyfile(src, target)
+
+def link_asset(digest, target, symlink=True):
+    """Make target a link to a stored blob"""
+    entry = get_index().get(digest)
+    if entry is None:
+        raise KeyError(f"Asset {digest} is not in the store")
+    blob = blob_path(digest, entry["ext"])
+    if not blob.exists():  # Don't leave a dangling symlink behind
+        raise FileNotFoundError(f"Asset {digest} is missing from {ASSET_DIR}")
+    link_file(blob, target, symlink)
+
+def remove(digest):
+    """Delete a blob from the store (hardlinks and copies made from it keep their content)"""
+    entry = get_index().get(digest)
+    if entry is not None:
+        blob_path(digest, entry["ext"]).unlink(missing_ok=True)
+        get_index().delete([digest])
+
+def ingest(path, source=None, digest=None, symlink=True):
+    """Store a freshly written file and leave `path` as a link to the stored blob"""
+    digest = put_file(path, source=source, digest=digest)
+    link_asset(digest, path, symlink)
+    # The renderer reads identity from the same index, so it never re-hashes this file
+    get_hash_index().remember(path, digest)
+    return digest
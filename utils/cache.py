@@ -0,0 +1,86 @@
+# utils/cache.py
+import json
+import sqlite3
+import threading
+import time
+
+from utils.telemetry import get_telemetry
+
+
+class SqliteCache:
+    """Persistent key/value store with JSON values, safe to share between threads.
+
+    ttl: seconds an entry stays valid (None = forever).
+    max_entries: oldest entries are evicted past this size (None = unbounded).
+    """
+
+    def __init__(self, path, table="cache", ttl=None, max_entries=None):
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys):
+        """Return {key: value} for the keys that are cached"""
+        keys = list(keys)
+        found = {}
+        oldest = time.time() - self.ttl if self.ttl else 0
+        with self.lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, value FROM {self.table} "
+                    f"WHERE key IN ({','.join('?' * len(chunk))}) AND created >= ?",
+                    chunk + [oldest]
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+        telemetry = get_telemetry()
+        telemetry.count("cache_requests_total", len(found), cache=self.table, result="hit")
+        telemetry.count("cache_requests_total", len(keys) - len(found), cache=self.table, result="miss")
+        return found
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, items):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created) VALUES (?, ?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False), now) for key, value in items.items()]
+            )
+            self._evict(now)
+
+    def delete(self, keys):
+        with self.lock, self.conn:
+            self.conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key in keys])
+
+    def entries(self, since=None):
+        """Every (key, value) pair (set at or after since, a time.time() value), least recently set first"""
+        with self.lock:
+            rows = self.conn.execute(f"SELECT key, value FROM {self.table} WHERE created >= ? ORDER BY created",
+                                     (since or 0,)).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def _evict(self, now):
+        """Drop expired rows and trim to max_entries (caller holds the lock)"""
+        if self.ttl:
+            self.conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,))
+        if self.max_entries:
+            self.conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
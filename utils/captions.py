@@ -0,0 +1,123 @@
+# utils/captions.py
+import hashlib
+import json
+import logging
+import os
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, features
+
+from config import FONT_FILE, CAPTION_FONT_SIZE, CAPTION_MAX_WIDTH, CAPTION_STYLE, CAPTION_CACHE_DIR
+
+try:
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+except ImportError:  # Only needed when Pillow lacks libraqm
+    arabic_reshaper = get_display = None
+
+# Tried in order when FONT_FILE is missing
+FALLBACK_FONTS = ["arialuni.ttf", "Arial Unicode.ttf", "arial.ttf", "DejaVuSans.ttf"]
+HAS_RAQM = features.check("raqm")
+
+@lru_cache(maxsize=None)
+def resolve_font(size=CAPTION_FONT_SIZE):
+    """First usable font, looked up once per process and size"""
+    layout = ImageFont.Layout.RAQM if HAS_RAQM else ImageFont.Layout.BASIC
+    candidates = ([str(FONT_FILE)] if FONT_FILE.exists() else []) + FALLBACK_FONTS
+    for candidate in candidates:
+        try:
+            return ImageFont.truetype(candidate, size, layout_engine=layout)
+        except OSError:
+            continue
+    logging.error("No caption font found, using Pillow's default font")
+    return ImageFont.load_default()
+
+@lru_cache(maxsize=1)
+def _warn_no_shaping():
+    logging.warning("Install arabic-reshaper and python-bidi (or Pillow with raqm) for Arabic captions")
+
+def shape_line(line):
+    """Visual-order text for Pillow; raqm shapes Arabic itself, otherwise reshape + bidi"""
+    if HAS_RAQM:
+        return line
+    if arabic_reshaper is None:
+        _warn_no_shaping()
+        return line
+    return get_display(arabic_reshaper.reshape(line))
+
+def wrap_text(text, font, max_width, stroke_width):
+    """Greedy word wrap measured in pixels"""
+    draw = ImageDraw.Draw(Image.new("L", (1, 1)))
+    lines = []
+    for word in text.split():
+        candidate = f"{lines[-1]} {word}" if lines else word
+        width = draw.textlength(shape_line(candidate), font=font) + 2 * stroke_width
+        if lines and width <= max_width:
+            lines[-1] = candidate
+        else:
+            lines.append(word)
+    return lines or [""]
+
+def _render(text, size, style):
+    font = resolve_font(size)
+    stroke = style["stroke_width"]
+    pad_x, pad_y = style["padding"]
+    draw = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+    lines = [shape_line(line) for line in wrap_text(text, font, CAPTION_MAX_WIDTH, stroke)]
+    boxes = [draw.textbbox((0, 0), line, font=font, stroke_width=stroke) for line in lines]
+    line_height = max(box[3] - box[1] for box in boxes)
+    text_w = max(box[2] - box[0] for box in boxes)
+    text_h = line_height * len(lines) + style["line_spacing"] * (len(lines) - 1)
+
+    box_alpha = int(round(255 * style["box_opacity"]))
+    image = Image.new("RGBA", (text_w + 2 * pad_x, text_h + 2 * pad_y), (*style["box_color"], box_alpha))
+    draw = ImageDraw.Draw(image)
+    y = pad_y
+    for line, box in zip(lines, boxes):
+        x = (image.width - (box[2] - box[0])) // 2 - box[0]
+        draw.text((x, y - box[1]), line, font=font, fill=(*style["color"], 255),
+                  stroke_width=stroke, stroke_fill=(*style["stroke_color"], 255))
+        y += line_height + style["line_spacing"]
+    return image
+
+def caption_path(text, size=CAPTION_FONT_SIZE, style=None):
+    """PNG of the caption in CAPTION_CACHE_DIR, rasterized once per (text, font, size, style)"""
+    style = style or CAPTION_STYLE
+    font_id = str(FONT_FILE) if FONT_FILE.exists() else "fallback"
+    key = json.dumps([text, font_id, size, style], sort_keys=True, ensure_ascii=False)
+    path = CAPTION_CACHE_DIR / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.png"
+    if not path.exists():
+        CAPTION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.png")
+        _render(text, size, style).save(tmp_path)
+        tmp_path.replace(path)
+    return path
+
+@lru_cache(maxsize=64)
+def caption_overlay(text, size=CAPTION_FONT_SIZE):
+    """(premultiplied RGB, 1 - alpha) float32 arrays, ready to blend onto frames"""
+    rgba = np.asarray(Image.open(caption_path(text, size)).convert("RGBA"), dtype=np.float32) / 255.0
+    alpha = rgba[..., 3:4]
+    return rgba[..., :3] * alpha * 255.0, 1.0 - alpha
+
+def overlay_caption(frame, overlay, x, y, copy=False):
+    """Blend a static caption onto the rows it covers; parts of it outside the frame are cropped off.
+
+    The frame is changed in place unless copy is set or it is read-only (MoviePy's reader hands out
+    read-only buffers, and the same one again for a repeated frame), in which case a copy is blended.
+    """
+    if copy or not frame.flags.writeable:
+        frame = frame.copy()
+    premultiplied, inverse_alpha = overlay
+    h, w = inverse_alpha.shape[:2]
+    top, left = max(0, -y), max(0, -x)
+    y, x = max(0, y), max(0, x)
+    h, w = min(h - top, frame.shape[0] - y), min(w - left, frame.shape[1] - x)
+    if h <= 0 or w <= 0:
+        return frame
+    region = frame[y:y + h, x:x + w]
+    region[...] = (region * inverse_alpha[top:top + h, left:left + w]
+                   + premultiplied[top:top + h, left:left + w]).astype(frame.dtype)
+    return frame
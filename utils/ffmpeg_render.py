@@ -0,0 +1,138 @@
+# utils/ffmpeg_render.py
+import logging
+import subprocess
+import tempfile
+from pathlib import Path
+
+from config import (VIDEO_RESOLUTION, VIDEO_FPS, FALLBACK_COLORS, FFMPEG_BINARY, RENDER_VIDEO_CODEC,
+                    RENDER_PRESET, RENDER_CRF, RENDER_AUDIO_BITRATE)
+from utils.file_hash import get_hash_index
+from utils.segment_cache import SegmentStream, concat_segments
+from utils.captions import caption_path
+from utils.ffprobe import probe_duration
+from utils.workspace import DEFAULT_WORKSPACE
+from utils.renderers import part_inputs
+AUDIO_FORMAT = "aformat=sample_rates=44100:channel_layouts=stereo"
+
+def prepare_segment(part, text, workspace=None):
+    """Everything the filter graph needs for one segment; files are only probed, never decoded"""
+    workspace = workspace or DEFAULT_WORKSPACE
+    audio_path, video_path = part_inputs(part, text, workspace)
+    duration = 5
+    if audio_path:
+        duration = probe_duration(audio_path)
+
+    video_hash = clip_duration = None
+    if video_path:
+        try:
+            video_hash = get_hash_index().hash(video_path)
+            clip_duration = probe_duration(video_path)
+        except Exception as e:
+            logging.error(f"Video load failed for part {part}: {str(e)}")
+            video_path = None
+
+    return {
+        "part": part,
+        "text": text,
+        "duration": duration,
+        "audio_path": audio_path,
+        "video_path": video_path,
+        "video_hash": video_hash,
+        "clip_duration": clip_duration,
+    }
+
+def build_filter_graph(segments):
+    """Compile the timeline into ffmpeg input arguments and one filter_complex script"""
+    width, height = VIDEO_RESOLUTION
+    inputs = []
+    chains = []
+    labels = []
+
+    def add_input(*args):
+        inputs.extend(args)
+        return sum(1 for arg in inputs if arg == "-i") - 1
+
+    for i, segment in enumerate(segments):
+        duration = segment["duration"]
+
+        if segment["video_path"]:
+            video_in = add_input("-i", str(segment["video_path"]))
+            clip_duration = segment["clip_duration"]
+            video = f"[{video_in}:v]"
+            filters = []
+            if clip_duration > duration:
+                filters.append(f"trim=0:{duration:.3f},setpts=PTS-STARTPTS")
+            elif clip_duration < duration:
+                # Same as speedx: slow the clip down to cover the narration
+                filters.append(f"setpts=PTS*{duration / clip_duration:.6f}")
+            if not segment.get("normalized"):
+                filters.append(f"fps={VIDEO_FPS},scale={width}:{height}:force_original_aspect_ratio=increase,"
+                               f"crop={width}:{height},setsar=1")
+            elif clip_duration < duration:
+                filters.append(f"fps={VIDEO_FPS}")
+            video += ",".join(filters) or "null"
+        else:
+            color = "0x%02x%02x%02x" % FALLBACK_COLORS[segment["part"] % len(FALLBACK_COLORS)]
+            video_in = add_input("-f", "lavfi", "-t", f"{duration:.3f}",
+                                 "-i", f"color=c={color}:s={width}x{height}:r={VIDEO_FPS}")
+            video = f"[{video_in}:v]setsar=1"
+        chains.append(f"{video}[base{i}]")
+
+        # Same Pillow-rendered caption raster as the MoviePy backend, overlaid bottom centre
+        caption_in = add_input("-i", str(caption_path(segment["text"])))
+        # Pad with the last frame then cut, so every segment is exactly as long as its audio
+        chains.append(f"[base{i}][{caption_in}:v]overlay=x=(W-w)/2:y=H-h,"
+                      f"tpad=stop_mode=clone:stop_duration=1,trim=duration={duration:.3f},format=yuv420p[v{i}]")
+
+        if segment["audio_path"]:
+            audio_in = add_input("-i", str(segment["audio_path"]))
+        else:
+            audio_in = add_input("-f", "lavfi", "-t", f"{duration:.3f}", "-i", "anullsrc=r=44100:cl=stereo")
+        chains.append(f"[{audio_in}:a]{AUDIO_FORMAT},apad,atrim=0:{duration:.3f},asetpts=PTS-STARTPTS[a{i}]")
+        labels.append(f"[v{i}][a{i}]")
+
+    chains.append(f"{''.join(labels)}concat=n={len(segments)}:v=1:a=1[vout][aout]")
+    return inputs, ";\n".join(chains)
+
+def encoder_args(threads=0):
+    return [
+        "-c:v", RENDER_VIDEO_CODEC, "-preset", RENDER_PRESET, "-crf", str(RENDER_CRF), "-threads", str(threads),
+        "-pix_fmt", "yuv420p", "-r", str(VIDEO_FPS),
+        "-c:a", "aac", "-b:a", RENDER_AUDIO_BITRATE, "-ar", "44100", "-ac", "2",
+    ]
+
+def render_segment(segment, output_path, threads=0):
+    """Render one segment with its own filter graph (threads=0 lets the encoder decide)"""
+    with tempfile.TemporaryDirectory(prefix="render_") as tmp:
+        inputs, graph = build_filter_graph([segment])
+        graph_file = Path(tmp) / "graph.txt"
+        graph_file.write_text(graph, encoding="utf-8")
+
+        command = [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error", *inputs,
+                   "-filter_complex_script", str(graph_file), "-map", "[vout]", "-map", "[aout]",
+                   *encoder_args(threads), str(output_path)]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg render failed: {result.stderr.strip()[-2000:]}")
+
+
+def render_stream(count):
+    """SegmentStream rendering prepared segments with ffmpeg as they are added"""
+    return SegmentStream(count, "ffmpeg", render_segment)
+
+def create_video(segments=None, workspace=None, stream=None):
+    """Render changed segments with ffmpeg and stream-copy them into the short.
+
+    Pass the stream every segment was already added to (see render_stream) instead of segments to
+    only wait for its renders.
+    """
+    workspace = workspace or DEFAULT_WORKSPACE
+    if stream is None:
+        if segments is None:
+            segments = [prepare_segment(part, text, workspace) for part, text in enumerate(workspace.read_lines())]
+        if not segments:
+            raise ValueError("No valid clips available for video creation")
+        stream = render_stream(len(segments))
+        for segment in segments:
+            stream.add(segment)
+    return concat_segments(stream.paths(), workspace.output_video)
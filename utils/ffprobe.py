@@ -0,0 +1,12 @@
+# utils/ffprobe.py
+import subprocess
+
+from config import FFPROBE_BINARY
+
+def probe_duration(path):
+    """Container duration in seconds via ffprobe"""
+    result = subprocess.run(
+        [FFPROBE_BINARY, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(path)],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip())
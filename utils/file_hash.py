@@ -0,0 +1,89 @@
+# utils/file_hash.py
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from config import OUTPUT_DIR
+
+# Persistent hash store, shared by the downloader and the renderer
+HASH_FILE = OUTPUT_DIR / "video_hashes.json"
+CHUNK_SIZE = 1024 * 1024
+
+def hash_file(path):
+    """sha256 of a file, read in chunks so large clips never sit in memory"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+class HashIndex:
+    """video_hashes.json: content hashes of local clips keyed by path and validated by (size, mtime)"""
+
+    def __init__(self, path=HASH_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.files = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logging.warning(f"Failed to load hash file: {e}")
+            return
+        if isinstance(data, list):  # Old format held first-chunk stream hashes, nothing to keep
+            return
+        with self.lock:
+            self.files = data.get("files", {})
+
+    def save(self):
+        with self.save_lock:
+            with self.lock:
+                data = {"files": dict(self.files)}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(f".{threading.get_ident()}.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logging.error(f"Failed to save video hashes: {e}")
+
+    def remember(self, path, digest):
+        """Record a hash that is already known (e.g. computed while storing the file)"""
+        stat = os.stat(path)
+        with self.lock:
+            self.files[os.path.abspath(path)] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha256": digest,
+            }
+
+    def hash(self, path):
+        """Content hash of path; only re-reads the file if its size or mtime changed"""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self.lock:
+            entry = self.files.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return entry["sha256"]
+        digest = hash_file(path)
+        self.remember(path, digest)
+        return digest
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_hash_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = HashIndex()
+        return _index
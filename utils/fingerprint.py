@@ -0,0 +1,203 @@
+# utils/fingerprint.py
+import json
+import logging
+import math
+import threading
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from config import OUTPUT_DIR, FINGERPRINT_FILE, FINGERPRINT_FRAMES, FINGERPRINT_MAX_DISTANCE, FINGERPRINT_MIN_MATCH_RATIO
+from utils import http_client
+from utils.cache import SqliteCache
+
+HASH_SIZE = 8  # 8x8 difference hash -> 64 bits
+LEGACY_FINGERPRINT_FILE = OUTPUT_DIR / "video_fingerprints.json"  # Before fingerprints moved to CACHE_DIR
+SYNC_SLACK = 60  # Seconds of already-read rows re-read on each sync, see FingerprintIndex.sync
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def dhash_image(image):
+    """64-bit difference hash: survives re-encoding, scaling and small colour shifts"""
+    small = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            offset = row * (HASH_SIZE + 1) + col
+            value = (value << 1) | (pixels[offset] > pixels[offset + 1])
+    return value
+
+def _evenly_spaced(items, count):
+    if len(items) <= count:
+        return list(items)
+    step = len(items) / count
+    return [items[int(i * step)] for i in range(count)]
+
+def fingerprint_pexels_video(video):
+    """Frame hashes of the preview stills Pexels sends with each search result.
+
+    The stills are small JPEGs sampled across the video, so this never touches the video file itself.
+    """
+    urls = [picture["picture"] for picture in video.get("video_pictures", []) if picture.get("picture")]
+    if not urls and video.get("image"):
+        urls = [video["image"]]
+
+    hashes = []
+    for url in _evenly_spaced(urls, FINGERPRINT_FRAMES):
+        response = http_client.get(url, timeout=15)
+        response.raise_for_status()
+        hashes.append(dhash_image(Image.open(BytesIO(response.content))))
+    return hashes
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes for Hamming-radius queries"""
+
+    def __init__(self):
+        self.root = None  # [hash, keys, {distance: child}]
+
+    def add(self, value, key):
+        if self.root is None:
+            self.root = [value, [key], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [key], {}]
+                return
+            node = child
+
+    def remove(self, value, key):
+        """Drop one entry of key under value; emptied nodes stay as routing nodes for their children"""
+        node = self.root
+        while node is not None:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                if key in node[1]:
+                    node[1].remove(key)
+                return
+            node = node[2].get(distance)
+
+    def query(self, value, radius):
+        """Keys of every stored hash within `radius` bits of value"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                found.extend(node[1])
+            # Triangle inequality: only subtrees at distance-radius..distance+radius can match
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+class FingerprintIndex:
+    """Fingerprints of downloaded videos, kept in a SqliteCache table shared by every process.
+
+    The BK-tree is built from the table and topped up with rows other processes wrote before each
+    claim, so main.py, batch.py and worker.py running side by side reject each other's footage.
+    A claim lives only in memory until confirm() writes it, so a failed download never blocks a video.
+    """
+
+    def __init__(self, path=FINGERPRINT_FILE):
+        self.store = SqliteCache(path, table="fingerprints")
+        self.lock = threading.Lock()
+        self.videos = {}
+        self.pending = set()  # Claimed but not downloaded yet, so not stored
+        self.tree = BKTree()
+        self.synced = 0  # time.time() of the last read from the store
+        self.sync()
+        if not self.videos:
+            self.import_legacy(LEGACY_FINGERPRINT_FILE)
+
+    def import_legacy(self, path):
+        """Copy fingerprints from the old outputs/video_fingerprints.json into the store"""
+        if not path.exists():
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except Exception as e:
+            logging.warning(f"Failed to read {path}: {e}")
+            return
+        self.store.set_many(legacy)
+        for key, hashes in legacy.items():
+            self._add(key, hashes)
+        logging.info(f"Imported {len(legacy)} video fingerprints from {path}")
+
+    def sync(self):
+        """Add rows written since the last read (caller holds the lock, or is __init__)"""
+        now = time.time()
+        # Rows are stamped before their transaction commits, so look back a little
+        for key, hashes in self.store.entries(since=self.synced - SYNC_SLACK if self.synced else None):
+            if key not in self.videos:
+                self._add(key, hashes)
+        self.synced = now
+
+    def _add(self, key, hashes):
+        self.videos[key] = hashes
+        for value in hashes:
+            self.tree.add(value, key)
+
+    def find_duplicate(self, hashes):
+        """Key of a stored video sharing enough near-identical frames with hashes, else None"""
+        if not hashes:
+            return None
+        matches = {}
+        for value in hashes:
+            for key in set(self.tree.query(value, FINGERPRINT_MAX_DISTANCE)):
+                matches[key] = matches.get(key, 0) + 1
+        needed = max(1, math.ceil(len(hashes) * FINGERPRINT_MIN_MATCH_RATIO))
+        best = max(matches, key=matches.get, default=None)
+        return best if best is not None and matches[best] >= needed else None
+
+    def claim(self, key, hashes):
+        """Add the video unless it (or a near-duplicate) is known; returns the clashing key or None"""
+        with self.lock:
+            self.sync()
+            if key in self.videos:
+                return key
+            duplicate = self.find_duplicate(hashes)
+            if duplicate is None:
+                self._add(key, hashes)
+                self.pending.add(key)
+            return duplicate
+
+    def confirm(self, key):
+        """Store a claimed video once downloaded, so later runs and other processes skip it"""
+        with self.lock:
+            if key not in self.pending:
+                return
+            self.pending.discard(key)
+            hashes = self.videos[key]
+        self.store.set(key, hashes)
+
+    def release(self, key):
+        """Forget a video whose download failed, so later parts and runs may pick it again"""
+        with self.lock:
+            stored = key in self.videos and key not in self.pending
+            self.pending.discard(key)
+            for value in self.videos.pop(key, []):
+                self.tree.remove(value, key)
+        if stored:  # A pending claim was never written, and the row may be another process's
+            self.store.delete([key])
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_fingerprint_index():
+    """Process-wide index, so concurrent jobs never claim the same footage"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FingerprintIndex()
+        return _index
@@ -1,10 +1,14 @@
 import requests
+from utils import http_client
 import time
 import sys
-from config import GEMINI_API_KEY_FILE
+from config import GEMINI_API_KEY_FILE, GEMINI_API_URL
 import logging
+from functools import lru_cache
 
+@lru_cache(maxsize=1)
 def load_api_key():
+    """Read on first use, so importing this module never touches the key file"""
     try:
         with open(GEMINI_API_KEY_FILE, 'r', encoding='utf-8') as f:
             api_key = f.read().strip()
@@ -23,9 +27,6 @@ def load_api_key():
         time.sleep(5)
         sys.exit(1)
 
-API_KEY = load_api_key()
-BASE_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash-latest:generateContent?key={API_KEY}"
-
 def generate_content(prompt):
     """Generate content using Gemini API"""
     try:
@@ -41,7 +42,7 @@ def generate_content(prompt):
             }]
         }
         
-        response = requests.post(BASE_URL, json=payload, headers=headers)
+        response = http_client.post(GEMINI_API_URL, params={'key': load_api_key()}, json=payload, headers=headers)
         response.raise_for_status()
         
         data = response.json()
@@ -0,0 +1,108 @@
+# utils/http_client.py
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_TIMEOUT, HTTP_RETRIES, HTTP_BACKOFF, HTTP_MAX_RETRY_AFTER, HTTP_POOL_SIZE
+from utils.rate_limiter import get_rate_limiter
+from utils.telemetry import get_telemetry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Only these are repeated after a 5xx or a transport error; a 429 was never processed, so it is retried for any method
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS", "TRACE"})
+# Dropped connections, connect/read timeouts and bodies cut off mid-transfer
+TRANSPORT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """One keep-alive session for every provider, with a connection pool per host"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Retries happen in request(), so each attempt goes through the rate limiter
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+def retry_delay(attempt, response=None):
+    """Seconds before retry number attempt (from 0): Retry-After when given, else HTTP_BACKOFF * 2**attempt"""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return HTTP_BACKOFF * 2 ** attempt
+
+def request(method, url, **kwargs):
+    """Rate-limited request on the shared session; HTTP_TIMEOUT applies unless one is given.
+
+    Up to HTTP_RETRIES retries on 429 (any method) and on 5xx or transport errors (idempotent
+    methods only, so a POST that may have been processed is never sent twice). Every attempt
+    takes a token from the host's rate limiter. A Retry-After beyond HTTP_MAX_RETRY_AFTER is not
+    waited for: the response is returned as is, so the caller fails over instead of stalling.
+    Latency (to the response headers for streamed requests) and bytes are recorded per provider host.
+    Streamed bodies are counted by the caller with count_received().
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    for attempt in range(HTTP_RETRIES + 1):
+        last = attempt == HTTP_RETRIES
+        response = _attempt(method, url, retry=idempotent and not last, **kwargs)
+        delay = retry_delay(attempt, response)
+        if response is not None:  # None: transport error on an idempotent request
+            status = response.status_code
+            if last or not (status == 429 or (idempotent and status in RETRY_STATUSES)):
+                return response
+            if delay > HTTP_MAX_RETRY_AFTER:
+                logging.warning(f"{urlparse(url).hostname} asked to retry in {delay:.0f}s, giving up")
+                return response
+            response.close()
+        time.sleep(delay)
+
+def _attempt(method, url, retry=False, **kwargs):
+    """One rate-limited, measured request; None instead of a transport error when retry is set"""
+    get_rate_limiter(url).acquire()
+    telemetry = get_telemetry()
+    provider = urlparse(url).hostname
+    started = time.perf_counter()
+    try:
+        response = get_session().request(method, url, **kwargs)
+    except TRANSPORT_ERRORS:
+        telemetry.count("http_requests_total", provider=provider, status="error")
+        if retry:
+            return None
+        raise
+    except Exception:
+        telemetry.count("http_requests_total", provider=provider, status="error")
+        raise
+    telemetry.observe("http_request_seconds", time.perf_counter() - started, provider=provider)
+    telemetry.count("http_requests_total", provider=provider, status=response.status_code)
+    body = response.request.body
+    if body:
+        telemetry.count("http_bytes_sent_total", len(body), provider=provider)
+    if not kwargs.get("stream"):
+        count_received(url, len(response.content))
+    return response
+
+def count_received(url, size):
+    get_telemetry().count("http_bytes_received_total", size, provider=urlparse(url).hostname)
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
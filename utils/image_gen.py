@@ -1,44 +1,45 @@
 # utils/image_gen.py
-import requests
 from PIL import Image
 from io import BytesIO
 from pathlib import Path
-from config import OUTPUT_DIR, IMAGE_DIR
 from tqdm import tqdm
 import logging
-import time
-from utils.translation import translate_to_english  # New import for translation
+from utils import http_client
+from utils.translation import translate_to_english, translate_batch
+from utils.workspace import DEFAULT_WORKSPACE
+from utils.manifest import artifact_key
+from config import POLLINATIONS_URL
 
-def generate_images():
+def generate_images(workspace=None):
     """Generate images for each line in the script by first translating Arabic prompts to English"""
+    workspace = workspace or DEFAULT_WORKSPACE
     try:
-        line_file = OUTPUT_DIR / "line_by_line.txt"
-        if not line_file.exists():
-            raise FileNotFoundError(f"Script file not found: {line_file}")
+        prompts = workspace.read_lines()
+        workspace.image_dir.mkdir(parents=True, exist_ok=True)
         
-        with open(line_file, 'r', encoding='utf-8') as f:
-            prompts = [line.strip() for line in f if line.strip()]
+        # One round trip warms the translation cache for every part
+        translate_batch(prompts)
         
         for part, prompt in enumerate(tqdm(prompts, desc="Generating images")):
             try:
-                image_path = IMAGE_DIR / f"part{part}.jpg"
-                if image_path.exists():
+                image_path = workspace.image_dir / f"part{part}.jpg"
+                key = artifact_key(prompt=prompt)
+                if workspace.manifest.is_fresh(image_path, key):
                     continue
+                workspace.manifest.invalidate(image_path)
                 
                 # Translate Arabic prompt to English
                 english_prompt = translate_to_english(prompt)
                 logging.info(f"Translated prompt: {prompt} -> {english_prompt}")
                 
-                url = f'https://image.pollinations.ai/prompt/{english_prompt}'
-                resp = requests.get(url, timeout=30)
+                url = f'{POLLINATIONS_URL}{english_prompt}'
+                resp = http_client.get(url, timeout=30)
                 resp.raise_for_status()
                 
                 # Save the image
                 img = Image.open(BytesIO(resp.content))
                 img.save(image_path)
-                
-                # Add slight delay to avoid rate limiting
-                time.sleep(1)
+                workspace.manifest.record(image_path, key)
                 
             except Exception as e:
                 logging.error(f'Error downloading/saving image [{prompt}]: {e}')
@@ -0,0 +1,84 @@
+# utils/job_queue.py
+import sqlite3
+import threading
+import time
+
+from config import JOB_QUEUE_FILE
+
+COLUMNS = ["id", "topic", "status", "workspace", "output", "error", "created", "started", "finished"]
+
+
+def read_topics(path):
+    """One topic per line; blank lines and lines starting with # are skipped"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class JobQueue:
+    """SQLite job table between submitters and the worker; a job goes queued -> running -> done | failed"""
+
+    def __init__(self, path=JOB_QUEUE_FILE):
+        self.lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit: every statement is its own transaction, so claim()'s single UPDATE is atomic
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30, isolation_level=None)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, status TEXT NOT NULL, "
+                "workspace TEXT, output TEXT, error TEXT, created REAL NOT NULL, started REAL, finished REAL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    def submit(self, topic):
+        """Queue a topic and return its job id"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (topic, status, created) VALUES (?, 'queued', ?)", (topic, time.time())
+            )
+            return cursor.lastrowid
+
+    def claim(self):
+        """Oldest queued job, marked running, or None when the queue is empty"""
+        with self.lock:
+            row = self.conn.execute(
+                "UPDATE jobs SET status = 'running', started = ? WHERE id = "
+                "(SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1) "
+                f"RETURNING {', '.join(COLUMNS)}",
+                (time.time(),)
+            ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def update(self, job_id, **fields):
+        if not fields:
+            return
+        with self.lock:
+            self.conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                [*fields.values(), job_id]
+            )
+
+    def finish(self, job_id, output=None, error=None):
+        self.update(job_id, status="failed" if error else "done", output=output, error=error,
+                    finished=time.time())
+
+    def requeue_running(self):
+        """Put jobs left running by a worker that died back in the queue; returns how many"""
+        with self.lock:
+            return self.conn.execute(
+                "UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'"
+            ).rowcount
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def list(self, limit=50):
+        """Most recent jobs first"""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
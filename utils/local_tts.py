@@ -0,0 +1,80 @@
+# utils/local_tts.py
+import logging
+import os
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from config import (FFMPEG_BINARY, LOCAL_TTS_WORKERS, LOCAL_TTS_RATE, LOCAL_TTS_VOLUME, LOCAL_TTS_VOICE)
+from utils.manifest import artifact_key
+
+# Same container as ElevenLabs' mp3_22050_32, so renderers can't tell the backends apart
+OUTPUT_FORMAT = "mp3_22050_32"
+
+_engine = None  # One pyttsx3 engine per worker process, reused for every sentence it speaks
+
+def _init_engine():
+    """Pool initializer: start the speech engine once, not per sentence"""
+    global _engine
+    import pyttsx3
+    _engine = pyttsx3.init()
+    _engine.setProperty('rate', LOCAL_TTS_RATE)
+    _engine.setProperty('volume', LOCAL_TTS_VOLUME)
+    if LOCAL_TTS_VOICE:
+        _engine.setProperty('voice', LOCAL_TTS_VOICE)
+
+def _synthesize(sentence, audio_path):
+    """Pool task: speak into a temp WAV, encode it to audio_path; returns the size written"""
+    audio_path = Path(audio_path)
+    wav_path = audio_path.with_name(f"{audio_path.stem}.{os.getpid()}.wav")
+    try:
+        _engine.save_to_file(sentence, str(wav_path))
+        _engine.runAndWait()
+        subprocess.run([FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error", "-i", str(wav_path),
+                        "-ar", "22050", "-ac", "1", "-b:a", "32k", "-f", "mp3", str(audio_path)],
+                       check=True, capture_output=True)
+    finally:
+        wav_path.unlink(missing_ok=True)
+    return audio_path.stat().st_size
+
+def tts_workers():
+    return max(1, LOCAL_TTS_WORKERS or os.cpu_count() or 1)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_tts_pool():
+    """Engine processes shared by every job in this process, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import pyttsx3  # noqa: F401 - fail here with ImportError rather than with a broken pool
+            _pool = ProcessPoolExecutor(max_workers=tts_workers(), initializer=_init_engine)
+        return _pool
+
+class LocalTTS:
+    """Offline pyttsx3 narration (SAPI5, NSSpeechSynthesizer or eSpeak, whatever the system has).
+
+    Sentences are spread over persistent engine processes, one per core by default, so a batch
+    of scripts is narrated at multi-core speed with no network round trips.
+    """
+
+    name = "local"
+
+    def __init__(self):
+        self.workers = tts_workers()
+
+    def key(self, sentence):
+        return artifact_key(text=sentence, engine="pyttsx3", voice=LOCAL_TTS_VOICE, rate=LOCAL_TTS_RATE,
+                            volume=LOCAL_TTS_VOLUME, output_format=OUTPUT_FORMAT)
+
+    def synthesize(self, sentence, audio_path):
+        return get_tts_pool().submit(_synthesize, sentence, str(audio_path)).result()
+
+    def warm_up(self):
+        """Start every engine process now"""
+        pool = get_tts_pool()
+        for future in [pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+        logging.info(f"Local TTS ready with {self.workers} engine processes")
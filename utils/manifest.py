@@ -0,0 +1,111 @@
+# utils/manifest.py
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from config import VIDEO_RESOLUTION, RENDITION_MAX_UPSCALE
+
+
+def artifact_key(**inputs):
+    """Hash of everything an artifact is built from (text, settings, parameters)"""
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str, ensure_ascii=False)
+                          .encode("utf-8")).hexdigest()
+
+def clip_key(prompt):
+    """Build-manifest key of a part's clip (here rather than in video_clip_gen, so the render stage
+    can check it without importing the HTTP and fingerprinting stack)"""
+    return artifact_key(prompt=prompt, resolution=VIDEO_RESOLUTION, max_upscale=RENDITION_MAX_UPSCALE)
+
+class Manifest:
+    """manifest.json in a workspace: artifact path (relative to the workspace) -> key of its inputs.
+
+    Stages rebuild an artifact unless it exists and was built from the same inputs, so an edited
+    script only redoes the parts whose sentence (or settings) changed. Artifacts kept in the asset
+    store are also indexed by key (key -> {"digest", ...}), so a sentence that moves to another
+    part is relinked from its blob instead of rebuilt.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.root = path.parent
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # Writers finishing out of order would drop newer entries
+        self.artifacts = {}
+        self.assets = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.artifacts = data.get("artifacts", {})
+            self.assets = data.get("assets", {})
+        except Exception as e:
+            logging.warning(f"Failed to load build manifest, everything will be rebuilt: {e}")
+
+    def save(self):
+        with self.save_lock:
+            with self.lock:
+                data = {"artifacts": dict(self.artifacts), "assets": dict(self.assets)}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(f".{threading.get_ident()}.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=1)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logging.error(f"Failed to save build manifest: {e}")
+
+    def _name(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def recorded(self, path):
+        """Key path was last built from, None if the manifest never saw it"""
+        with self.lock:
+            return self.artifacts.get(self._name(path))
+
+    def asset(self, key):
+        """Stored asset an artifact was built into from key ({"digest", ...}), None if there is none"""
+        with self.lock:
+            return self.assets.get(key)
+
+    def forget_asset(self, key):
+        with self.lock:
+            self.assets.pop(key, None)
+        self.save()
+
+    def is_fresh(self, path, key):
+        """path exists and was built from the inputs behind key"""
+        with self.lock:
+            recorded = self.artifacts.get(self._name(path))
+        return recorded == key and os.path.exists(path)
+
+    def is_stale(self, path, *keys):
+        """path was recorded from inputs other than any of keys (files the manifest never saw are trusted)"""
+        with self.lock:
+            recorded = self.artifacts.get(self._name(path))
+        return recorded is not None and recorded not in keys
+
+    def invalidate(self, path):
+        """Forget path and delete it, returns True if there was a file to delete"""
+        with self.lock:
+            self.artifacts.pop(self._name(path), None)
+        if os.path.lexists(path):
+            os.unlink(path)
+            return True
+        return False
+
+    def record(self, path, key, asset=None):
+        """Note that path was just built from key, saved right away so an interrupted run keeps it.
+
+        asset ({"digest", ...}) is the stored blob path links to, found again by key with asset().
+        """
+        with self.lock:
+            self.artifacts[self._name(path)] = key
+            if asset is not None:
+                self.assets[key] = asset
+        self.save()
@@ -0,0 +1,118 @@
+# utils/normalize.py
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import (VIDEO_RESOLUTION, VIDEO_FPS, FFMPEG_BINARY, NORMALIZE_CLIPS, NORMALIZE_WORKERS,
+                    NORMALIZE_MAX_DURATION, NORMALIZE_GOP, NORMALIZE_CRF, NORMALIZE_PRESET)
+from utils.asset_store import blob_path
+from utils.file_hash import get_hash_index
+from utils.ffprobe import probe_duration
+from utils.telemetry import get_telemetry
+
+NORMALIZE_PARAMS = {
+    "resolution": VIDEO_RESOLUTION,
+    "fps": VIDEO_FPS,
+    "pix_fmt": "yuv420p",
+    "gop": NORMALIZE_GOP,
+    "max_duration": NORMALIZE_MAX_DURATION,
+    "crf": NORMALIZE_CRF,
+    "preset": NORMALIZE_PRESET,
+}
+PARAMS_TAG = hashlib.sha256(json.dumps(NORMALIZE_PARAMS, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+def normalized_path(digest):
+    """Conformed copy of an asset, stored next to the original blob"""
+    return blob_path(digest, f".norm-{PARAMS_TAG}.mp4")
+
+def normalize_clip(src_path, digest):
+    """Transcode a clip once to the render format: cover-scaled and cropped to VIDEO_RESOLUTION,
+    VIDEO_FPS, yuv420p, fixed GOP, no audio, at most NORMALIZE_MAX_DURATION seconds."""
+    target = normalized_path(digest)
+    if target.exists():
+        get_telemetry().count("cache_requests_total", cache="normalized", result="hit")
+        return target
+    get_telemetry().count("cache_requests_total", cache="normalized", result="miss")
+
+    width, height = VIDEO_RESOLUTION
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f"{target.stem}.{os.getpid()}.{threading.get_ident()}.tmp.mp4")
+    command = [
+        FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error", "-i", str(src_path),
+        "-t", str(NORMALIZE_MAX_DURATION), "-an",
+        "-vf", (f"fps={VIDEO_FPS},scale={width}:{height}:force_original_aspect_ratio=increase,"
+                f"crop={width}:{height},setsar=1,format=yuv420p"),
+        "-c:v", "libx264", "-preset", NORMALIZE_PRESET, "-crf", str(NORMALIZE_CRF),
+        "-g", str(NORMALIZE_GOP), "-keyint_min", str(NORMALIZE_GOP), "-sc_threshold", "0",
+        "-movflags", "+faststart", str(tmp_path),
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        tmp_path.unlink(missing_ok=True)
+        raise RuntimeError(f"ffmpeg normalize failed: {result.stderr.strip()[-2000:]}")
+    os.replace(tmp_path, target)
+    return target
+
+class Normalizer:
+    """Background pool that conforms clips as soon as they are downloaded"""
+
+    def __init__(self, max_workers=NORMALIZE_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="normalize")
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def submit(self, clip_path):
+        if not NORMALIZE_CLIPS:
+            return None
+        digest = get_hash_index().hash(clip_path)
+        with self.lock:
+            future = self.pending.get(digest)
+            if future is None:
+                future = self.pending[digest] = self.executor.submit(self._run, clip_path, digest)
+            return future
+
+    def _run(self, clip_path, digest):
+        try:
+            return normalize_clip(clip_path, digest)
+        except Exception as e:
+            logging.error(f"Normalizing {clip_path} failed, the raw clip will be used: {e}")
+            return None
+
+    def wait(self, digests=None):
+        """Block until the submitted clips with these digests (every submitted clip by default) are done"""
+        with self.lock:
+            if digests is None:
+                futures = list(self.pending.values())
+            else:
+                futures = [self.pending[digest] for digest in digests if digest in self.pending]
+        wait(futures)
+
+_normalizer = None
+_normalizer_lock = threading.Lock()
+
+def get_normalizer():
+    global _normalizer
+    with _normalizer_lock:
+        if _normalizer is None:
+            _normalizer = Normalizer()
+        return _normalizer
+
+def use_normalized_clips(segments):
+    """Point segments at their conformed clips where one exists (waits for their running normalizations)"""
+    if not NORMALIZE_CLIPS:
+        return
+    index = get_hash_index()
+    get_normalizer().wait([index.hash(segment["video_path"]) for segment in segments if segment["video_path"]])
+    for segment in segments:
+        if not segment["video_path"]:
+            continue
+        normalized = normalized_path(index.hash(segment["video_path"]))
+        if normalized.exists():
+            segment["video_path"] = normalized
+            segment["normalized"] = True
+            if "clip_duration" in segment:
+                segment["clip_duration"] = probe_duration(normalized)
@@ -0,0 +1,89 @@
+# utils/pipeline.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import CLIP_WORKERS, SEGMENT_WORKERS, TTS_WHOLE_SCRIPT
+from utils.script_writer import generate_script, has_script
+from utils.video_clip_gen import ClipRun, fetch_clip
+from utils.voice_gen import get_tts_backend, synthesize_sentence, synthesize_script
+from utils.renderers import get_renderer
+from utils.translation import translate_batch
+from utils.workspace import DEFAULT_WORKSPACE
+from utils.telemetry import get_telemetry, timed
+
+
+def start_segment(renderer, stream, part, text, workspace):
+    """Probe one part's inputs and hand the segment to the render stream"""
+    stream.add(renderer.prepare_segment(part, text, workspace))
+
+def run_pipeline(topic=None, workspace=None, regenerate_script=False):
+    """Run all stages, overlapping clip and voice work and rendering each segment as soon as its inputs exist.
+
+    Dependencies per line: clip + voice -> segment render (once earlier parts rule out a duplicate
+    clip). Only the final stream copy waits for every segment.
+    All job files go to workspace (outputs/ by default); caches and rate limits are shared process-wide.
+    A script already in the workspace for the same topic is kept unless regenerate_script, so an
+    interrupted job resumes with the parts it finished instead of starting over on a new script.
+    """
+    started = time.perf_counter()
+    workspace = (workspace or DEFAULT_WORKSPACE).create()
+    telemetry = get_telemetry()
+
+    with telemetry.span("script", workspace.root):
+        if not regenerate_script and has_script(topic, workspace):
+            logging.info(f"Reusing the script in {workspace.line_file} (--regenerate-script for a new one)")
+        else:
+            logging.info("Generating script content...")
+            generate_script(topic, workspace)
+
+    lines = workspace.read_lines()
+    if not lines:
+        raise ValueError("Script has no lines to render")
+
+    # Whole script in one translation request, clip workers then read from the cache
+    with telemetry.span("translate", workspace.root):
+        translate_batch(lines)
+    clip_run = ClipRun(workspace)
+    voice = get_tts_backend()
+    renderer = get_renderer()
+    stream = renderer.render_stream(len(lines))
+
+    logging.info(f"Fetching clips and voiceovers for {len(lines)} lines...")
+    with telemetry.span("parts", workspace.root), \
+            ThreadPoolExecutor(max_workers=CLIP_WORKERS) as clip_pool, \
+            ThreadPoolExecutor(max_workers=voice.workers) as voice_pool, \
+            ThreadPoolExecutor(max_workers=SEGMENT_WORKERS) as segment_pool:
+        pending = {}  # input future -> parts it provides
+        waiting = [2] * len(lines)  # inputs still missing per part
+        for part, text in enumerate(lines):
+            pending[clip_pool.submit(timed, "clip", workspace.root, part, fetch_clip, part, text, clip_run)] = [part]
+        if TTS_WHOLE_SCRIPT:
+            # One narration request for the script, every part's audio lands at once
+            pending[voice_pool.submit(timed, "voice", workspace.root, "all", synthesize_script,
+                                      voice, lines, workspace)] = list(range(len(lines)))
+        else:
+            for part, text in enumerate(lines):
+                pending[voice_pool.submit(timed, "voice", workspace.root, part, synthesize_sentence,
+                                          voice, part, text, len(lines), workspace)] = [part]
+
+        segment_futures = []
+        for future in as_completed(pending):
+            future.result()
+            for part in pending[future]:
+                waiting[part] -= 1
+                if waiting[part] == 0:
+                    logging.info(f"[Part {part}] Inputs ready, preparing segment")
+                    segment_futures.append(segment_pool.submit(timed, "segment", workspace.root, part,
+                                                               start_segment, renderer, stream, part,
+                                                               lines[part], workspace))
+
+        clip_run.save()
+        for future in segment_futures:
+            future.result()
+
+    logging.info("Creating final video...")
+    with telemetry.span("render", workspace.root):
+        video_path = renderer.create_video(workspace=workspace, stream=stream)
+    logging.info(f"Pipeline finished in {time.perf_counter() - started:.1f}s")
+    return video_path
@@ -0,0 +1,47 @@
+# utils/rate_limiter.py
+import threading
+import time
+from urllib.parse import urlparse
+
+from config import RATE_LIMITS, DEFAULT_RATE_LIMIT
+
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` saved up"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, cost=1):
+        """Block until `cost` tokens are available, then take them"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # Costs bigger than the bucket go through once it is full and leave it in debt
+                needed = min(cost, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= cost
+                    return
+                wait = (needed - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(url_or_host):
+    """Return the shared limiter for a host (accepts a full URL or a bare host name)"""
+    host = urlparse(url_or_host).hostname or url_or_host
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            rate, burst = RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT)
+            limiter = _limiters[host] = RateLimiter(rate, burst)
+        return limiter
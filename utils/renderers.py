@@ -0,0 +1,34 @@
+# utils/renderers.py
+import logging
+
+from config import RENDER_BACKEND
+from utils.manifest import clip_key
+
+
+def get_renderer(backend=RENDER_BACKEND):
+    """Render backend module, imported on first use so only the chosen one is loaded (MoviePy is slow to import).
+
+    Both expose prepare_segment(part, text, workspace), render_stream(count) and
+    create_video(segments, workspace=..., stream=...).
+    """
+    if backend == "ffmpeg":
+        from utils import ffmpeg_render as renderer
+    else:
+        from utils import video_creation as renderer
+    return renderer
+
+def part_inputs(part, text, workspace):
+    """(audio path, clip path) for a part, None where the file is missing or the manifest says it was
+    built for another sentence (the voice or media stage has not been re-run since the script changed)"""
+    from utils.voice_gen import voice_keys  # Narration keys depend on the configured TTS backend
+
+    paths = []
+    for path, keys in [(workspace.audio_dir / f"part{part}.mp3", voice_keys(text)),
+                       (workspace.video_clip_dir / f"part{part}.mp4", [clip_key(text)])]:
+        if not path.exists():
+            path = None
+        elif workspace.manifest.is_stale(path, *keys):
+            logging.warning(f"[Part {part}] {path.name} was made for an older script, leaving it out")
+            path = None
+        paths.append(path)
+    return tuple(paths)
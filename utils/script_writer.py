@@ -1,14 +1,13 @@
 from utils.gemini import generate_content
-from config import OUTPUT_DIR
+from utils.workspace import DEFAULT_WORKSPACE
 import logging
+import os
 from pathlib import Path
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-def generate_script(topic=None):
+def generate_script(topic=None, workspace=None):
     """Generate video script content in Markdown format with duration control"""
+    workspace = workspace or DEFAULT_WORKSPACE
     try:
         if not topic:
             topic = input("أدخل موضوع الفيديو: ")
@@ -60,15 +59,15 @@ word_count: {word_count}
 {content}
 """
         # Save markdown
-        script_path = OUTPUT_DIR / "script.md"
+        script_path = workspace.script_file
         script_path.parent.mkdir(parents=True, exist_ok=True)
         
         with open(script_path, 'w', encoding='utf-8') as f:
             f.write(md_content)
         
         # Create processed versions
-        create_line_by_line(script_path)
-        create_plain_text_version(script_path)
+        create_line_by_line(script_path, workspace)
+        create_plain_text_version(script_path, workspace)
         
         logging.info(f"تم حفظ النص في: {script_path}")
         return script_path
@@ -77,8 +76,30 @@ word_count: {word_count}
         logging.error(f"فشل إنشاء النص: {str(e)}")
         raise
 
-def create_line_by_line(md_path):
+def script_topic(workspace=None):
+    """Topic recorded in the workspace's script front matter, None if there is no script"""
+    workspace = workspace or DEFAULT_WORKSPACE
+    if not workspace.script_file.exists():
+        return None
+    with open(workspace.script_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('title:'):
+                return line[len('title:'):].strip()
+    return None
+
+def has_script(topic, workspace=None):
+    """True when the workspace already has a line-by-line script written for topic.
+
+    Without a topic there is nothing to match, so this is False and the caller asks for a new one.
+    """
+    workspace = workspace or DEFAULT_WORKSPACE
+    if not topic or not workspace.line_file.exists() or not workspace.line_file.read_text(encoding='utf-8').strip():
+        return False
+    return script_topic(workspace) == topic.strip()
+
+def create_line_by_line(md_path, workspace=None):
     """Create duration-controlled line-by-line version"""
+    workspace = workspace or DEFAULT_WORKSPACE
     try:
         with open(md_path, 'r', encoding='utf-8') as f:
             text = f.read()
@@ -112,10 +133,12 @@ def create_line_by_line(md_path):
             selected_sentences.append(sentence)
             word_count += sentence_words
         
-        # Save truncated version
-        line_path = OUTPUT_DIR / "line_by_line.txt"
-        with open(line_path, 'w', encoding='utf-8') as f:
+        # Save truncated version (atomically: an existing line file means the script is done)
+        line_path = workspace.line_file
+        tmp_path = line_path.with_name(f"{line_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             f.write('\n'.join(selected_sentences))
+        os.replace(tmp_path, line_path)
         
         logging.info(f"تم إنشاء النسخة السطرية مع {word_count} كلمة (~{round(word_count/avg_words_per_second)} ثانية)")
         return line_path
@@ -124,8 +147,9 @@ def create_line_by_line(md_path):
         logging.error(f"فشل إنشاء النسخة السطرية: {str(e)}")
         raise
 
-def create_plain_text_version(md_path):
+def create_plain_text_version(md_path, workspace=None):
     """Create basic plain text version"""
+    workspace = workspace or DEFAULT_WORKSPACE
     try:
         with open(md_path, 'r', encoding='utf-8') as f:
             text = f.read()
@@ -139,7 +163,7 @@ def create_plain_text_version(md_path):
             if line and not line.startswith(('title:', 'date:', 'lang:', 'word_count:')):
                 lines.append(line)
         
-        txt_path = OUTPUT_DIR / "plain_text.txt"
+        txt_path = workspace.plain_text_file
         with open(txt_path, 'w', encoding='utf-8') as f:
             f.write('\n'.join(lines))
         
@@ -0,0 +1,167 @@
+# utils/segment_cache.py
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from config import (SEGMENT_CACHE_DIR, VIDEO_RESOLUTION, VIDEO_FPS, FONT_FILE, FALLBACK_COLORS, FFMPEG_BINARY,
+                    CAPTION_FONT_SIZE, CAPTION_STYLE, RENDER_VIDEO_CODEC, RENDER_PRESET, RENDER_CRF, RENDER_AUDIO_BITRATE, RENDER_WORKERS)
+from utils.file_hash import get_hash_index
+from utils.normalize import use_normalized_clips
+from utils.telemetry import get_telemetry
+
+# Bump when segment rendering changes in a way the inputs below don't capture
+SEGMENT_CACHE_VERSION = 2
+
+def segment_key(segment, backend):
+    """Hash of everything that affects a rendered segment"""
+    index = get_hash_index()
+    inputs = {
+        "version": SEGMENT_CACHE_VERSION,
+        "backend": backend,
+        "text": segment["text"],
+        "duration": round(segment["duration"], 3),
+        "audio": index.hash(segment["audio_path"]) if segment["audio_path"] else None,
+        "video": (index.hash(segment["video_path"]) if segment["video_path"]
+                  else FALLBACK_COLORS[segment["part"] % len(FALLBACK_COLORS)]),
+        "resolution": VIDEO_RESOLUTION,
+        "fps": VIDEO_FPS,
+        "font": index.hash(FONT_FILE) if FONT_FILE.exists() else None,
+        "caption": [CAPTION_FONT_SIZE, CAPTION_STYLE],
+        "encoder": [RENDER_VIDEO_CODEC, RENDER_PRESET, RENDER_CRF, RENDER_AUDIO_BITRATE],
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _render_to_cache(render_one, segment, path, threads):
+    """Pool task: render into a private temp file, then publish it under its key; returns seconds spent"""
+    started = time.perf_counter()
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.mp4")
+    render_one(segment, tmp_path, threads)
+    os.replace(tmp_path, path)
+    return time.perf_counter() - started
+
+def render_workers():
+    return max(1, RENDER_WORKERS or os.cpu_count() or 1)
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+def get_render_pool():
+    """Process pool shared by every job in this process, so concurrent jobs split the cores between them"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=render_workers())
+        return _render_pool
+
+class SegmentStream:
+    """Renders a job's segments as they are added, so rendering overlaps the fetching of later parts.
+
+    A segment is rendered once it is known whether its clip repeats an earlier part's (the first part
+    keeps the clip, later ones get a fallback background), i.e. as soon as an earlier part with the
+    same clip is known or every earlier part is. render_one(segment, path,
+    threads) runs only for cache misses, on the shared render pool (RENDER_WORKERS processes, one per
+    core by default); it must be a module-level function and segments plain data, since both are
+    pickled to the workers. Cores are split between workers for the encoder threads.
+    """
+
+    def __init__(self, count, backend, render_one):
+        self.count = count
+        self.backend = backend
+        self.render_one = render_one
+        self.lock = threading.Lock()
+        self.segments = [None] * count  # Added so far, by part
+        self.waiting = set()  # Added parts whose duplicate check depends on parts not added yet
+        self.renders = [None] * count  # (path, future or None for a cache hit) per resolved part
+        self.threads = max(1, (os.cpu_count() or 1) // min(max(count, 1), render_workers()))
+        self.started = None
+        SEGMENT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    def add(self, segment):
+        """Take a prepared segment, start rendering it and any later parts it was holding back"""
+        use_normalized_clips([segment])
+        with self.lock:
+            self.segments[segment["part"]] = segment
+            self.waiting.add(segment["part"])
+            ready = [part for part in sorted(self.waiting) if self._resolve(part)]
+            self.waiting.difference_update(ready)
+        for part in ready:
+            self._render(self.segments[part])
+
+    def _resolve(self, part):
+        """Settle whether part keeps its clip; False while that depends on a part not added yet (caller holds the lock)"""
+        segment = self.segments[part]
+        video_hash = segment.get("video_hash")
+        if not video_hash:
+            return True
+        earlier = self.segments[:part]
+        if any(other is not None and other.get("video_hash") == video_hash for other in earlier):
+            logging.warning(f"Duplicate video at part {part}")
+            segment["video_path"] = None
+            return True
+        return all(other is not None for other in earlier)
+
+    def _render(self, segment):
+        path = SEGMENT_CACHE_DIR / f"{segment_key(segment, self.backend)}.mp4"
+        future = None
+        if path.exists():
+            logging.info(f"[Part {segment['part']}] Segment unchanged, reusing render")
+        else:
+            logging.info(f"[Part {segment['part']}] Rendering segment")
+            if self.started is None:
+                self.started = time.perf_counter()
+            if render_workers() == 1:
+                future = Future()
+                try:
+                    future.set_result(_render_to_cache(self.render_one, segment, path, self.threads))
+                except Exception as e:
+                    future.set_exception(e)
+            else:
+                future = get_render_pool().submit(_render_to_cache, self.render_one, segment, path, self.threads)
+        self.renders[segment["part"]] = (path, future)
+
+    def paths(self):
+        """Rendered file for every segment, in part order, once all are done"""
+        missing = [part for part, render in enumerate(self.renders) if render is None]
+        if missing:
+            raise ValueError(f"Segments never added for parts {missing}")
+        get_hash_index().save()
+        telemetry = get_telemetry()
+        misses = [(self.segments[part], future) for part, (_, future) in enumerate(self.renders) if future]
+        telemetry.count("cache_requests_total", self.count - len(misses), cache="segments", result="hit")
+        telemetry.count("cache_requests_total", len(misses), cache="segments", result="miss")
+
+        if misses:
+            # Workers are other processes, so their timings are recorded here
+            frames = 0
+            for segment, future in misses:
+                telemetry.observe("render_segment_seconds", future.result(), backend=self.backend)
+                frames += round(segment["duration"] * VIDEO_FPS)
+            elapsed = time.perf_counter() - self.started
+            telemetry.count("render_frames_total", frames, backend=self.backend)
+            telemetry.gauge("render_fps", round(frames / elapsed, 2), backend=self.backend)
+            logging.info(f"Rendered {len(misses)} segments, {frames} frames in {elapsed:.1f}s "
+                         f"({frames / elapsed:.1f} fps) on {min(len(misses), render_workers())} processes "
+                         f"x {self.threads} threads")
+        return [path for path, _ in self.renders]
+
+def concat_segments(paths, output_path):
+    """Join rendered segments without re-encoding (concat demuxer, stream copy)"""
+    with tempfile.TemporaryDirectory(prefix="concat_") as tmp:
+        list_file = Path(tmp) / "segments.txt"
+        with open(list_file, "w", encoding="utf-8") as f:
+            for path in paths:
+                escaped = str(Path(path).resolve()).replace("\\", "/").replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        command = [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                   "-i", str(list_file), "-c", "copy", "-movflags", "+faststart", str(output_path)]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg concat failed: {result.stderr.strip()[-2000:]}")
+    return str(output_path)
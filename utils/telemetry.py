@@ -0,0 +1,187 @@
+# utils/telemetry.py
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from config import METRICS_FILE
+
+METRIC_PREFIX = "shorts_"
+# Seconds; covers a cached lookup up to a long render
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _labels_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [(name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+class Telemetry:
+    """Process-wide spans, latency histograms and counters.
+
+    Spans carry a `workspace` label so each job's run report only holds its own timeline, while
+    histograms and counters aggregate over the process for the Prometheus textfile.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.spans = []
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self.counters = {}  # (name, labels) -> value
+        self.gauges = {}  # (name, labels) -> value
+
+    @contextmanager
+    def span(self, name, workspace=None, **labels):
+        """Time a block; recorded even if it raises (with error=True)"""
+        started = time.time()
+        clock = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            seconds = time.perf_counter() - clock
+            self.observe("span_seconds", seconds, span=name)
+            with self.lock:
+                self.spans.append({
+                    "name": name,
+                    "workspace": str(workspace) if workspace is not None else None,
+                    "labels": {key: str(value) for key, value in labels.items()},
+                    "start": round(started - self.started, 4),
+                    "seconds": round(seconds, 4),
+                    "error": error,
+                })
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels_key(labels))
+        index = bisect_left(BUCKETS, value)
+        with self.lock:
+            histogram = self.histograms.setdefault(key, [0] * (len(BUCKETS) + 2))
+            for i in range(index, len(BUCKETS)):
+                histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def count(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, _labels_key(labels))] = value
+
+    def cache_hit_rates(self):
+        """{cache: hit ratio} from the cache_requests_total counters"""
+        totals = {}
+        with self.lock:
+            for (name, labels), value in self.counters.items():
+                if name == "cache_requests_total":
+                    labels = dict(labels)
+                    hits, total = totals.get(labels["cache"], (0, 0))
+                    totals[labels["cache"]] = (hits + (value if labels["result"] == "hit" else 0), total + value)
+        return {cache: round(hits / total, 4) for cache, (hits, total) in totals.items() if total}
+
+    def snapshot(self):
+        """Process-wide metrics as plain data"""
+        def flatten(items):
+            return [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in items]
+
+        with self.lock:
+            histograms = [{
+                "name": name,
+                "labels": dict(labels),
+                "count": values[-1],
+                "sum": round(values[-2], 4),
+                "buckets": dict(zip(map(str, BUCKETS), values[:len(BUCKETS)])),
+            } for (name, labels), values in self.histograms.items()]
+            counters = flatten(self.counters.items())
+            gauges = flatten(self.gauges.items())
+        return {"histograms": histograms, "counters": counters, "gauges": gauges,
+                "cache_hit_rates": self.cache_hit_rates()}
+
+    def take_spans(self, workspace):
+        """Remove and return the spans recorded for workspace"""
+        workspace = str(workspace)
+        with self.lock:
+            taken = [span for span in self.spans if span["workspace"] == workspace]
+            self.spans = [span for span in self.spans if span["workspace"] != workspace]
+        return taken
+
+    def write_run_report(self, path, workspace, **summary):
+        """JSON report for one run: its spans, per-span totals and the process metrics so far"""
+        spans = self.take_spans(workspace)
+        totals = {}
+        for span in spans:
+            total = totals.setdefault(span["name"], {"count": 0, "seconds": 0.0})
+            total["count"] += 1
+            total["seconds"] = round(total["seconds"] + span["seconds"], 4)
+        report = {"workspace": str(workspace), "finished": time.time(), **summary,
+                  "span_totals": totals, "spans": spans, "metrics": self.snapshot()}
+        _write_atomic(path, json.dumps(report, ensure_ascii=False, indent=1))
+        return report
+
+    def write_prometheus(self, path):
+        """Textfile for node_exporter's textfile collector"""
+        lines = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+
+        typed = set()
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+
+        for (name, labels), values in histograms:
+            declare(name, "histogram")
+            for bound, bucket in zip(BUCKETS, values):
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, [('le', str(bound))])} {bucket}")
+            lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {values[-2]}")
+            lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {values[-1]}")
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            declare(name, "gauge")
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+def _write_atomic(path, text):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.error(f"Failed to write {path}: {e}")
+
+_telemetry = Telemetry()
+
+def get_telemetry():
+    return _telemetry
+
+def timed(name, workspace, part, fn, *args):
+    """fn(*args) inside a per-part span, for handing to executors"""
+    with _telemetry.span(name, workspace, part=part):
+        return fn(*args)
+
+def write_reports(workspace, **summary):
+    """run_report.json in the workspace plus the process-wide Prometheus textfile"""
+    _telemetry.write_run_report(workspace.root / "run_report.json", workspace.root, **summary)
+    _telemetry.write_prometheus(METRICS_FILE)
@@ -1,26 +1,64 @@
 # utils/translation.py
-import requests
 import logging
+import threading
+from config import TRANSLATION_CACHE_FILE, TRANSLATE_URL
+from utils.cache import SqliteCache
+from utils import http_client
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_translation_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SqliteCache(TRANSLATION_CACHE_FILE, table="translations")
+        return _cache
+
+def _cache_key(text, source, target):
+    return f"{source}|{target}|{text}"
+
+def _request_translation(texts, source, target):
+    """Translate texts with one Google Translate call (lines are sent newline-joined)"""
+    params = {
+        'client': 'gtx',
+        'sl': source,
+        'tl': target,
+        'dt': 't',
+        'q': "\n".join(texts)
+    }
+
+    response = http_client.get(TRANSLATE_URL, params=params)
+    response.raise_for_status()
+    # The response is split into sentence segments; glue them back and split on our newlines
+    translated = "".join(segment[0] for segment in response.json()[0] if segment and segment[0])
+    lines = [line.strip() for line in translated.split("\n")]
+
+    if len(lines) != len(texts):
+        if len(texts) == 1:
+            return [translated.strip()]
+        logging.warning(f"Batch translation returned {len(lines)} lines for {len(texts)}, translating one by one")
+        return [_request_translation([text], source, target)[0] for text in texts]
+    return lines
+
+def translate_batch(texts, source='ar', target='en'):
+    """Translate many lines; cached lines are free and the rest cost a single request"""
+    cache = get_translation_cache()
+    keys = {text: _cache_key(text, source, target) for text in texts if text.strip()}
+    cached = cache.get_many(keys.values())
+
+    missing = [text for text in dict.fromkeys(keys) if keys[text] not in cached]
+    if missing:
+        try:
+            translated = _request_translation(missing, source, target)
+            new_entries = {keys[text]: result for text, result in zip(missing, translated) if result}
+            cache.set_many(new_entries)
+            cached.update(new_entries)
+        except Exception as e:
+            logging.error(f"Translation failed: {str(e)}")
+
+    return [cached.get(keys[text], text) if text in keys else text for text in texts]
 
 def translate_to_english(text):
-    """Fallback translation using Google Translate API"""
-    try:
-        if not text.strip():
-            return text
-            
-        url = "https://translate.googleapis.com/translate_a/single"
-        params = {
-            'client': 'gtx',
-            'sl': 'ar',
-            'tl': 'en',
-            'dt': 't',
-            'q': text
-        }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()[0][0][0]
-        
-    except Exception as e:
-        logging.error(f"Translation failed: {str(e)}")
-        return text
\ No newline at end of file
+    """Translate one Arabic line to English (cached; falls back to the original text on failure)"""
+    return translate_batch([text])[0]
@@ -0,0 +1,78 @@
+# utils/tts_cache.py
+import logging
+import os
+import threading
+
+from config import TTS_CACHE_FILE, TTS_CACHE_MAX_BYTES
+from utils.cache import SqliteCache
+from utils import asset_store
+from utils.telemetry import get_telemetry
+
+
+class TTSCache:
+    """Synthesized narration keyed by everything that shapes it (text, voice, model, settings, format).
+
+    Shared by every workspace, so a line that recurs across scripts (intros, outros, calls to action)
+    is paid for once. The audio is kept in the asset store and the index maps key -> {"digest", "size"};
+    entries are re-set on every hit, so their age is the time of last use and the least recently used
+    are evicted once the cache grows past max_bytes. Parts are hardlinks or copies of the stored audio,
+    never symlinks, so they keep their narration when it is evicted.
+    """
+
+    def __init__(self, path=TTS_CACHE_FILE, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.index = SqliteCache(path, table="tts")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def fetch(self, key, target):
+        """Link the cached audio for key to target and mark it used; False on a miss"""
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return False
+            try:
+                asset_store.link_asset(entry["digest"], target, symlink=False)
+            except (KeyError, FileNotFoundError):  # Removed from the store by another process
+                self.index.delete([key])
+                return False
+            self.index.set(key, entry)
+        return True
+
+    def store(self, key, path):
+        """Move a freshly synthesized file into the cache, leaving path as a link to it"""
+        size = os.path.getsize(path)
+        digest = asset_store.ingest(path, source=f"tts:{key}", symlink=False)
+        with self.lock:
+            self.index.set(key, {"digest": digest, "size": size})
+            self._evict()
+
+    def _evict(self):
+        """Remove least recently used audio until the cache fits max_bytes (caller holds the lock)"""
+        if not self.max_bytes:
+            return
+        entries = self.index.entries()
+        total = sum(entry["size"] for _, entry in entries)
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        while total > self.max_bytes and evicted < len(entries):
+            total -= entries[evicted][1]["size"]
+            evicted += 1
+        self.index.delete([key for key, _ in entries[:evicted]])
+        kept = {entry["digest"] for _, entry in entries[evicted:]}  # Same audio under another key
+        for _, entry in entries[:evicted]:
+            if entry["digest"] not in kept:
+                asset_store.remove(entry["digest"])
+        get_telemetry().count("tts_cache_evictions_total", evicted)
+        logging.info(f"TTS cache over {self.max_bytes} bytes, evicted {evicted} files")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_tts_cache():
+    """One cache for the whole process, opened on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSCache()
+        return _cache
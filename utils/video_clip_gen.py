@@ -1,23 +1,30 @@
 # utils/video_clip_gen.py
-import requests
 import logging
-import time
 import hashlib
 import json
 import os
-from pathlib import Path
+import threading
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
-from config import OUTPUT_DIR, VIDEO_CLIP_DIR, VIDEO_RESOLUTION
-from utils.translation import translate_to_english
+from config import (PEXELS_API_KEY_FILE, PEXELS_API_URL, VIDEO_RESOLUTION, RENDITION_MAX_UPSCALE,
+                    CLIP_WORKERS, DOWNLOAD_ATTEMPTS, PEXELS_CACHE_FILE, PEXELS_CACHE_TTL, PEXELS_CACHE_MAX_ENTRIES)
+from utils.cache import SqliteCache
+from utils.asset_store import ingest, link_asset, link_file
+from utils.file_hash import get_hash_index
+from utils.normalize import get_normalizer
+from utils.fingerprint import get_fingerprint_index, fingerprint_pexels_video
+from utils.translation import translate_to_english, translate_batch
+from utils import http_client
+from utils.workspace import DEFAULT_WORKSPACE
+from utils.manifest import clip_key
+from utils.telemetry import timed
 
-# Pexels API
-PEXELS_API_KEY_FILE = Path(__file__).parent.parent / "pexels_secret.txt"
-PEXELS_API_URL = "https://api.pexels.com/videos/search"
-
-# Persistent hash store
-HASH_FILE = OUTPUT_DIR / "video_hashes.json"
+# Pexels downloads
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
 
+@lru_cache(maxsize=1)
 def load_pexels_api_key():
     try:
         with open(PEXELS_API_KEY_FILE, 'r', encoding='utf-8') as f:
@@ -29,56 +36,135 @@ def load_pexels_api_key():
         logging.error("Pexels API key file not found. Please create 'pexels_secret.txt'")
         raise
 
-def download_video_clip(url, save_path):
-    try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        with open(save_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        return True
-    except Exception as e:
-        logging.error(f"Failed to download video clip: {str(e)}")
-        return False
+def _expected_size(response, offset):
+    """Full file size from Content-Range (206) or Content-Length (200), None if unknown"""
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    if "Content-Length" in response.headers:
+        return offset + int(response.headers["Content-Length"])
+    return None
 
-def get_partial_video_hash(url):
-    try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        hasher = hashlib.md5()
-        for chunk in response.iter_content(8192):
-            hasher.update(chunk)
-            break  # First chunk only
-        return hasher.hexdigest()
-    except Exception as e:
-        logging.error(f"Failed to hash remote video: {e}")
-        return None
+def download_video_clip(url, save_path, attempts=DOWNLOAD_ATTEMPTS):
+    """Download url to save_path in one pass; returns the content sha256, or None on failure.
 
-def load_existing_hashes():
-    if HASH_FILE.exists():
+    Bytes are hashed as they stream into a per-URL temp file, which is renamed into place only once
+    complete. An interrupted transfer (this run or an earlier one) resumes with a Range request.
+    """
+    url_tag = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+    tmp_path = save_path.with_name(f"{save_path.name}.{url_tag}.download")
+
+    for attempt in range(1, attempts + 1):
         try:
-            with open(HASH_FILE, "r", encoding="utf-8") as f:
-                return set(json.load(f))
+            hasher = hashlib.sha256()
+            offset = tmp_path.stat().st_size if tmp_path.exists() else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+            with http_client.get(url, stream=True, headers=headers) as response:
+                if response.status_code == 416:  # Stale partial file, start over
+                    tmp_path.unlink()
+                    raise IOError("Range not satisfiable")
+                response.raise_for_status()
+
+                if offset and response.status_code == 206:
+                    # Resuming: the hash still has to cover the bytes already on disk
+                    with open(tmp_path, 'rb') as f:
+                        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+                            hasher.update(chunk)
+                    mode = 'ab'
+                else:
+                    offset = 0
+                    mode = 'wb'
+                expected = _expected_size(response, offset)
+
+                with open(tmp_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        hasher.update(chunk)
+
+            size = tmp_path.stat().st_size
+            http_client.count_received(url, size - offset)
+            if expected is not None and size != expected:
+                raise IOError(f"Incomplete download: {size} of {expected} bytes")
+
+            os.replace(tmp_path, save_path)
+            return hasher.hexdigest()
+
         except Exception as e:
-            logging.warning(f"Failed to load hash file: {e}")
-    return set()
+            logging.warning(f"Download attempt {attempt}/{attempts} for {save_path.name} failed: {str(e)}")
 
-def save_hashes(hashes):
-    try:
-        with open(HASH_FILE, "w", encoding="utf-8") as f:
-            json.dump(list(hashes), f)
-    except Exception as e:
-        logging.error(f"Failed to save video hashes: {e}")
+    logging.error(f"Failed to download video clip: {url}")
+    return None
+
+class DuplicateVideoError(ValueError):
+    """Every usable search result is a (near-)duplicate of a clip already used"""
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache():
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SqliteCache(PEXELS_CACHE_FILE, table="searches",
+                                        ttl=PEXELS_CACHE_TTL, max_entries=PEXELS_CACHE_MAX_ENTRIES)
+        return _search_cache
 
-def search_pexels_video(english_prompt, per_page=5, min_duration=4, max_duration=10):
+def search_pexels_videos(params):
+    """Return the `videos` list for a Pexels search, served from the cache while fresh (only non-empty results are cached)"""
+    cache = get_search_cache()
+    key = json.dumps(params, sort_keys=True)
+    videos = cache.get(key)
+    if videos is not None:
+        logging.info(f"Pexels search cache hit: {params['query']}")
+        return videos
+
+    headers = {"Authorization": load_pexels_api_key()}
+    response = http_client.get(PEXELS_API_URL, headers=headers, params=params)
+    response.raise_for_status()
+    videos = response.json().get('videos') or []
+    if videos:  # An empty answer may be transient, don't pin "no results" for the whole TTL
+        cache.set(key, videos)
+    return videos
+
+def rank_renditions(videos):
+    """Every usable file across all results as (video, file), best first.
+
+    Files that cover VIDEO_RESOLUTION without upscaling come first, smallest first by pixels x
+    duration, with the reported size (when known) breaking ties. Files that would need upscaling follow, least
+    upscaling first, and anything beyond RENDITION_MAX_UPSCALE is dropped.
+    """
+    target_w, target_h = VIDEO_RESOLUTION
+    ranked = []
+    for video in videos:
+        for file in video.get('video_files', []):
+            width, height = file.get('width') or 0, file.get('height') or 0
+            if not width or not height or file.get('file_type', 'video/mp4') != 'video/mp4':
+                continue
+            # Scale needed to cover the frame before the centre crop; above 1 means upscaling
+            scale = max(target_w / width, target_h / height)
+            if scale > RENDITION_MAX_UPSCALE:
+                continue
+            if scale <= 1:
+                pixel_seconds = width * height * max(video.get('duration') or 1, 1)
+                size = file.get('size') or float('inf')
+                ranked.append(((0, pixel_seconds, size), video, file))
+            else:
+                ranked.append(((1, scale, 0), video, file))
+    ranked.sort(key=lambda item: item[0])
+    return [(video, file) for _, video, file in ranked]
+
+def search_pexels_video(english_prompt, per_page=5, min_duration=4, max_duration=10, accept=None):
+    """Link of the best rendition (see rank_renditions); accept(video) can veto results (e.g. duplicates)"""
     try:
         simplified_prompt = " ".join([
             "bioelectricity" if "bio" in english_prompt.lower() else word
             for word in english_prompt.split()[:6]
         ])
-        headers = {"Authorization": load_pexels_api_key()}
+        # Normalised so casing/spacing differences share one cache entry
+        query = " ".join(f"{english_prompt} crime scene historical mystery".lower().split())
         params = {
-            "query": f"{english_prompt} crime scene historical mystery",
+            "query": query,
             "per_page": per_page,
             "min_duration": min_duration,
             "max_duration": max_duration,
@@ -86,94 +172,187 @@ def search_pexels_video(english_prompt, per_page=5, min_duration=4, max_duration
             "size": "medium",
             "color": "dark"
         }
-        response = requests.get(PEXELS_API_URL, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if not data.get('videos'):
+        videos = search_pexels_videos(params)
+        if not videos:
             raise ValueError("No videos found")
 
-        for video in data['videos']:
-            for file in video['video_files']:
-                if file['quality'] in ['hd', 'sd'] and file['width'] >= 720:
-                    return file['link']
+        verdicts = {}  # video id -> accepted, so each video is checked once
+        for video, file in rank_renditions(videos):
+            if accept is not None and video['id'] not in verdicts:
+                verdicts[video['id']] = accept(video)
+            if verdicts.get(video['id'], True):
+                logging.info(f"Picked {file['width']}x{file['height']} rendition of video {video['id']}")
+                return file['link']
 
+        if verdicts:
+            raise DuplicateVideoError("All suitable videos are duplicates")
         raise ValueError("No suitable video file found")
     except Exception as e:
         logging.error(f"Pexels search failed: {str(e)}")
         raise
 
-def get_existing_unique_videos():
+def get_existing_unique_videos(clip_dir):
     """Return paths to previously downloaded unique video clips"""
-    return sorted([
-        VIDEO_CLIP_DIR / fname for fname in os.listdir(VIDEO_CLIP_DIR)
-        if fname.endswith(".mp4")
-    ])
+    unique = {}
+    for path in sorted(clip_dir / fname for fname in os.listdir(clip_dir) if fname.endswith(".mp4")):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue  # Dangling symlink
+        # Part files linked to the same stored asset are one video
+        unique.setdefault((stat.st_dev, stat.st_ino), path)
+    return list(unique.values())
+
+class ClipRun:
+    """Shared state for one generate_video_clips run (fingerprint index + fallback pool)"""
 
-def generate_video_clips():
+    def __init__(self, workspace=None):
+        self.workspace = workspace or DEFAULT_WORKSPACE
+        self.workspace.video_clip_dir.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.fingerprints = get_fingerprint_index()
+        # Clips of sentences still in the script, their footage stays claimed when they change slot
+        self.keys = {clip_key(line) for line in self.workspace.read_lines()}
+        self.reusable_videos = get_existing_unique_videos(self.workspace.video_clip_dir)
+        self.fallback_index = 0
+
+    def claim_video(self, video, claimed=None):
+        """Reserve a Pexels result for this part; False if it looks like a clip already used.
+
+        The key of an accepted video is appended to claimed, so the caller can confirm it once
+        downloaded or release it if the download fails.
+        """
+        key = f"pexels:{video['id']}"
+        try:
+            hashes = fingerprint_pexels_video(video)
+        except Exception as e:
+            logging.warning(f"Could not fingerprint video {video['id']}, checking its id only: {e}")
+            hashes = []
+        duplicate = self.fingerprints.claim(key, hashes)
+        if duplicate:
+            logging.info(f"Video {video['id']} matches {duplicate}, skipping")
+        elif claimed is not None:
+            claimed.append(key)
+        return duplicate is None
+
+    def relink_clip(self, key, target):
+        """Link the clip downloaded earlier for the same sentence (now in another part) to target"""
+        asset = self.workspace.manifest.asset(key)
+        if asset is None:
+            return False
+        try:
+            link_asset(asset["digest"], target)
+        except (KeyError, FileNotFoundError):  # Removed from the store since
+            self.workspace.manifest.forget_asset(key)
+            return False
+        self.workspace.manifest.record(target, key, asset)
+        return True
+
+    def drop_clip(self, key):
+        """Forget the clip of a sentence that left the script and release its footage for other parts"""
+        asset = self.workspace.manifest.asset(key)
+        if asset is None:
+            return
+        for video_key in asset.get("videos", []):
+            self.fingerprints.release(video_key)
+        self.workspace.manifest.forget_asset(key)
+
+    def save(self):
+        get_hash_index().save()
+
+    def reuse_fallback(self, target):
+        """Link the next previously downloaded unique video to target, returns its source or None"""
+        with self.lock:
+            while True:
+                if self.fallback_index >= len(self.reusable_videos):
+                    return None
+                fallback_clip = self.reusable_videos[self.fallback_index]
+                self.fallback_index += 1
+                if fallback_clip.exists():  # Stale parts are deleted as the run goes
+                    break
+        link_file(fallback_clip, target)
+        return fallback_clip
+
+def fetch_clip(part, prompt, run):
+    """Get the clip for one script line, then queue it for normalization in the background"""
+    clip_path = acquire_clip(part, prompt, run)
+    if clip_path:
+        get_normalizer().submit(clip_path)
+    return clip_path
+
+def acquire_clip(part, prompt, run):
+    """Translate, search, dedupe and download the clip for one script line"""
+    manifest = run.workspace.manifest
+    clip_path = run.workspace.video_clip_dir / f"part{part}.mp4"
+    key = clip_key(prompt)
+    if manifest.is_fresh(clip_path, key):
+        return clip_path
+    previous = manifest.recorded(clip_path)
+    if manifest.invalidate(clip_path):
+        logging.info(f"[Part {part}] Sentence changed")
+    if previous is not None and previous not in run.keys:
+        run.drop_clip(previous)
+    if run.relink_clip(key, clip_path):
+        logging.info(f"[Part {part}] Sentence moved, reusing its clip")
+        return clip_path
+
+    claimed = []
     try:
-        line_file = OUTPUT_DIR / "line_by_line.txt"
-        if not line_file.exists():
-            raise FileNotFoundError(f"Script file not found: {line_file}")
-
-        with open(line_file, 'r', encoding='utf-8') as f:
-            prompts = [line.strip() for line in f if line.strip()]
-
-        VIDEO_CLIP_DIR.mkdir(parents=True, exist_ok=True)
-        used_hashes = load_existing_hashes()
-        reusable_videos = get_existing_unique_videos()
-        fallback_index = 0
-
-        for part, prompt in enumerate(tqdm(prompts, desc="Generating video clips")):
-            try:
-                clip_path = VIDEO_CLIP_DIR / f"part{part}.mp4"
-                if clip_path.exists():
-                    continue
-
-                english_prompt = translate_to_english(prompt)
-                logging.info(f"[Part {part}] Translated: {prompt} -> {english_prompt}")
-
-                video_url = search_pexels_video(english_prompt)
-                video_hash = get_partial_video_hash(video_url)
-
-                if not video_hash:
-                    raise ValueError("Could not generate hash from video URL")
-
-                if video_hash in used_hashes:
-                    logging.warning(f"[Part {part}] Duplicate video detected, using fallback.")
-                    # Reuse a previously downloaded unique video as fallback
-                    if fallback_index < len(reusable_videos):
-                        fallback_clip = reusable_videos[fallback_index % len(reusable_videos)]
-                        fallback_index += 1
-                        fallback_target = VIDEO_CLIP_DIR / f"part{part}.mp4"
-                        with open(fallback_clip, 'rb') as src, open(fallback_target, 'wb') as dst:
-                            dst.write(src.read())
-                        continue
-                    else:
-                        logging.warning(f"[Part {part}] No fallback available, skipping.")
-                        continue
-
-                if download_video_clip(video_url, clip_path):
-                    used_hashes.add(video_hash)
-                    logging.info(f"[Part {part}] Video downloaded and saved.")
-                else:
-                    raise ValueError("Download failed")
-
-                time.sleep(1)
-
-            except Exception as e:
-                logging.error(f"[Part {part}] Error: {e}")
-                # Use fallback if download or processing fails
-                if fallback_index < len(reusable_videos):
-                    fallback_clip = reusable_videos[fallback_index % len(reusable_videos)]
-                    fallback_index += 1
-                    fallback_target = VIDEO_CLIP_DIR / f"part{part}.mp4"
-                    with open(fallback_clip, 'rb') as src, open(fallback_target, 'wb') as dst:
-                        dst.write(src.read())
-                    logging.info(f"[Part {part}] Fallback video reused from: {fallback_clip.name}")
-                else:
-                    logging.warning(f"[Part {part}] No fallback available for error case.")
+        english_prompt = translate_to_english(prompt)
+        logging.info(f"[Part {part}] Translated: {prompt} -> {english_prompt}")
+
+        try:
+            # Near-duplicates are rejected from their preview stills, before any download
+            video_url = search_pexels_video(english_prompt, accept=partial(run.claim_video, claimed=claimed))
+        except DuplicateVideoError:
+            logging.warning(f"[Part {part}] Duplicate video detected, using fallback.")
+            # Reuse a previously downloaded unique video as fallback
+            if run.reuse_fallback(clip_path):
+                manifest.record(clip_path, key)
+                return clip_path
+            logging.warning(f"[Part {part}] No fallback available, skipping.")
+            return None
+
+        digest = download_video_clip(video_url, clip_path)
+        if digest:
+            ingest(clip_path, source=video_url, digest=digest)
+            for video_key in claimed:
+                run.fingerprints.confirm(video_key)
+            logging.info(f"[Part {part}] Video downloaded and saved.")
+            manifest.record(clip_path, key, {"digest": digest, "videos": claimed})
+            return clip_path
+
+        raise ValueError("Download failed")
+
+    except Exception as e:
+        logging.error(f"[Part {part}] Error: {e}")
+        for video_key in claimed:  # Never fetched, so not a duplicate for later parts
+            run.fingerprints.release(video_key)
+        # Use fallback if download or processing fails
+        fallback_clip = run.reuse_fallback(clip_path)
+        if fallback_clip:
+            logging.info(f"[Part {part}] Fallback video reused from: {fallback_clip.name}")
+            manifest.record(clip_path, key)
+            return clip_path
+        logging.warning(f"[Part {part}] No fallback available for error case.")
+        return None
+
+def generate_video_clips(max_workers=CLIP_WORKERS, workspace=None):
+    """Fetch a clip for every script line, up to max_workers parts at a time"""
+    try:
+        run = ClipRun(workspace)
+        prompts = run.workspace.read_lines()
+        # One round trip warms the translation cache for every part
+        translate_batch(prompts)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(timed, "clip", run.workspace.root, part, fetch_clip, part, prompt, run)
+                       for part, prompt in enumerate(prompts)]
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Generating video clips"):
+                future.result()
 
-        save_hashes(used_hashes)
+        run.save()
+        get_normalizer().wait()
         return True
 
     except Exception as e:
@@ -1,68 +1,45 @@
-import os
 import logging
-import hashlib
-from moviepy.editor import (VideoFileClip, AudioFileClip, CompositeVideoClip,
-                          concatenate_videoclips, TextClip, ColorClip)
+import numpy as np
+from math import ceil
+from moviepy.editor import VideoFileClip, AudioFileClip, ColorClip, ImageClip
+from moviepy.audio.AudioClip import AudioArrayClip
 from moviepy.video.fx import all as vfx
-from config import VIDEO_RESOLUTION, VIDEO_FPS, FONT_FILE
-
-# Fallback system
-FALLBACK_COLORS = [
-    (40, 40, 40),   # Dark gray
-    (10, 20, 30),   # Dark blue
-    (30, 10, 10)    # Dark red
-]
+from config import (VIDEO_RESOLUTION, VIDEO_FPS, FALLBACK_COLORS, RENDER_VIDEO_CODEC,
+                    RENDER_PRESET, RENDER_CRF, RENDER_AUDIO_BITRATE)
+from utils.file_hash import get_hash_index
+from utils.captions import caption_overlay, overlay_caption
+from utils.segment_cache import SegmentStream, concat_segments
+from utils.workspace import DEFAULT_WORKSPACE
+from utils.renderers import part_inputs
 
 def get_fallback_clip(index, duration):
     """Returns a colored background clip as fallback"""
     return ColorClip(VIDEO_RESOLUTION, color=FALLBACK_COLORS[index % 3]).set_duration(duration)
 
 def get_video_hash(video_path):
-    """Generate consistent hash for video file"""
-    with open(video_path, 'rb') as f:
-        return hashlib.md5(f.read()).hexdigest()
-
-def create_text(text, duration):
-    """Improved text creation with multiple fallback fonts"""
-    font_options = [
-        str(FONT_FILE) if FONT_FILE.exists() else None,
-        'Arial-Unicode-MS',
-        'Arial',
-        'Courier-New',
-        'Verdana',
-        None  # System default
-    ]
-    
-    for font in font_options:
-        try:
-            text_clip = TextClip(
-                txt=text,
-                fontsize=70,
-                color='white',
-                font=font,
-                stroke_color='black',
-                stroke_width=2,
-                size=(1000, None),
-                method='caption',
-                align='center',
-                kerning=2
-            ).set_duration(duration)
-            
-            bg = ColorClip(
-                size=(text_clip.w + 40, text_clip.h + 20),
-                color=(0, 0, 0)
-            ).set_opacity(0.6).set_duration(duration)
-            
-            return CompositeVideoClip([
-                bg.set_position(('center', 'bottom')),
-                text_clip.set_position(('center', 'bottom'))
-            ])
-        except Exception as e:
-            logging.warning(f"Failed with font {font}: {str(e)}")
-            continue
-    
-    logging.error("All font options failed for text")
-    return ColorClip((100,100), color=(0,0,0)).set_duration(0.1)
+    """Content hash for a video file, cached by (path, size, mtime) in video_hashes.json"""
+    return get_hash_index().hash(video_path)
+
+def caption_position(overlay):
+    """Top-left corner that puts a caption overlay at the bottom centre of the frame (never off its
+    top or left edge, for captions larger than the frame)"""
+    h, w = overlay[1].shape[:2]
+    return max(0, (VIDEO_RESOLUTION[0] - w) // 2), max(0, VIDEO_RESOLUTION[1] - h)
+
+def add_caption(clip, text, part, duration):
+    """Burn the cached caption raster into the clip, touching only the rows it covers.
+
+    Frames coming out of resize/crop are fresh arrays and get blended in place; reader frames are
+    read-only and get copied by overlay_caption.
+    """
+    overlay = caption_overlay(text)
+    x, y = caption_position(overlay)
+    if isinstance(clip, ColorClip):
+        # Static background: blend once instead of on every frame
+        color = np.array(FALLBACK_COLORS[part % len(FALLBACK_COLORS)], dtype=np.uint8)
+        frame = np.tile(color, (VIDEO_RESOLUTION[1], VIDEO_RESOLUTION[0], 1))
+        return ImageClip(overlay_caption(frame, overlay, x, y)).set_duration(duration)
+    return clip.fl_image(lambda frame: overlay_caption(frame, overlay, x, y))
 
 def create_video_clip(video_path, duration):
     try:
@@ -72,63 +49,94 @@ def create_video_clip(video_path, duration):
         elif clip.duration < duration:
             clip = clip.fx(vfx.speedx, clip.duration/duration)
         
-        clip = clip.resize(height=VIDEO_RESOLUTION[1])
-        if clip.w > VIDEO_RESOLUTION[0]:
-            clip = clip.crop(x_center=clip.w/2, width=VIDEO_RESOLUTION[0])
+        # Cover the frame then centre-crop, same as the ffmpeg backend (normalized clips already fit)
+        width, height = VIDEO_RESOLUTION
+        if tuple(clip.size) != (width, height):
+            scale = max(width / clip.w, height / clip.h)
+            clip = clip.resize(newsize=(ceil(clip.w * scale), ceil(clip.h * scale)))
+            clip = clip.crop(x_center=clip.w/2, y_center=clip.h/2, width=width, height=height)
         
         return clip.set_position('center')
     except Exception as e:
         logging.error(f"Video clip error: {str(e)}")
         return get_fallback_clip(0, duration)
 
-def create_video():
-    with open('./outputs/line_by_line.txt', 'r', encoding='utf-8') as f:
-        content = [line.strip() for line in f if line.strip()]
-    
-    clips = []
-    used_hashes = set()
-    
-    for part, text in enumerate(content):
-        # Audio handling
-        audio_path = f'./outputs/audio/part{part}.mp3'
-        if os.path.exists(audio_path):
-            audioclip = AudioFileClip(audio_path)
-            duration = audioclip.duration
-        else:
-            duration = 5
-            audioclip = AudioClip(lambda t: 0, duration=duration)
-        
-        # Video handling with deduplication
-        video_path = f'./outputs/video_clips/part{part}.mp4'
-        if os.path.exists(video_path):
-            try:
-                current_hash = get_video_hash(video_path)
-                if current_hash in used_hashes:
-                    logging.warning(f"Duplicate video at part {part}")
-                    video_clip = get_fallback_clip(part, duration)
-                else:
-                    used_hashes.add(current_hash)
-                    video_clip = create_video_clip(video_path, duration)
-            except Exception as e:
-                logging.error(f"Video load failed for part {part}: {str(e)}")
-                video_clip = get_fallback_clip(part, duration)
-        else:
-            video_clip = get_fallback_clip(part, duration)
-        
-        # Text handling
-        text_clip = create_text(text, duration)
-        
-        # Compose final segment
-        segment = CompositeVideoClip([
-            video_clip,
-            text_clip
-        ]).set_audio(audioclip)
-        clips.append(segment)
-    
-    if not clips:
-        raise ValueError("No valid clips available for video creation")
-    
-    final_clip = concatenate_videoclips(clips)
-    output_path = './outputs/youtube_short.mp4'
-    final_clip.write_videofile(output_path, fps=VIDEO_FPS, threads=4)
-    return output_path
\ No newline at end of file
+def prepare_segment(part, text, workspace=None):
+    """Probe one segment's inputs; clips are only opened when it is rendered (in a worker process)"""
+    workspace = workspace or DEFAULT_WORKSPACE
+    audio_path, video_path = part_inputs(part, text, workspace)
+    duration = 5
+    if audio_path:
+        audioclip = AudioFileClip(str(audio_path))
+        duration = audioclip.duration
+        audioclip.close()
+
+    # Duplicates are resolved in order by the SegmentStream
+    video_hash = None
+    if video_path:
+        try:
+            video_hash = get_video_hash(video_path)
+        except Exception as e:
+            logging.error(f"Video load failed for part {part}: {str(e)}")
+            video_path = None
+
+    return {
+        "part": part,
+        "text": text,
+        "duration": duration,
+        "audio_path": audio_path,
+        "video_path": video_path,
+        "video_hash": video_hash,
+    }
+
+def render_segment(segment, output_path, threads=4):
+    """Compose and write one segment with the same stream layout as the ffmpeg backend"""
+    part, duration = segment["part"], segment["duration"]
+    if segment["audio_path"]:
+        audioclip = AudioFileClip(str(segment["audio_path"]))
+    else:
+        # Stereo 44.1kHz like the narration, so segments can be stream-copied together
+        audioclip = AudioArrayClip(np.zeros((int(duration * 44100), 2)), fps=44100)
+
+    if segment["video_path"]:
+        video_clip = create_video_clip(segment["video_path"], duration)
+    else:
+        video_clip = get_fallback_clip(part, duration)
+
+    clip = add_caption(video_clip, segment["text"], part, duration).set_audio(audioclip)
+    clip.write_videofile(
+        str(output_path),
+        fps=VIDEO_FPS,
+        codec=RENDER_VIDEO_CODEC,
+        preset=RENDER_PRESET,
+        audio_codec="aac",
+        audio_fps=44100,
+        audio_bitrate=RENDER_AUDIO_BITRATE,
+        ffmpeg_params=["-crf", str(RENDER_CRF), "-pix_fmt", "yuv420p", "-ac", "2"],
+        threads=threads,
+        logger=None
+    )
+    clip.close()
+
+
+def render_stream(count):
+    """SegmentStream rendering prepared segments with MoviePy as they are added"""
+    return SegmentStream(count, "moviepy", render_segment)
+
+def create_video(segments=None, workspace=None, stream=None):
+    """Compose and write the final video with MoviePy from prepared segments (prepares them if not given).
+
+    Only segments whose inputs changed are re-encoded, the rest come from the segment cache. Pass the
+    stream every segment was already added to (see render_stream) instead of segments to only wait
+    for its renders. Use utils.renderers.get_renderer() to honour RENDER_BACKEND.
+    """
+    workspace = workspace or DEFAULT_WORKSPACE
+    if stream is None:
+        if segments is None:
+            segments = [prepare_segment(part, text, workspace) for part, text in enumerate(workspace.read_lines())]
+        if not segments:
+            raise ValueError("No valid clips available for video creation")
+        stream = render_stream(len(segments))
+        for segment in segments:
+            stream.add(segment)
+    return concat_segments(stream.paths(), workspace.output_video)
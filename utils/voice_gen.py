@@ -1,11 +1,23 @@
+import base64
 import time
 from pathlib import Path
-from elevenlabs.client import ElevenLabs
-from elevenlabs import VoiceSettings
-from config import AUDIO_DIR, OUTPUT_DIR, ELEVENLABS_API_KEY_FILE, VOICE_ID, VOICE_SETTINGS
+from concurrent.futures import ThreadPoolExecutor
+from config import (ELEVENLABS_API_KEY_FILE, ELEVENLABS_BASE_URL, VOICE_ID, VOICE_SETTINGS,
+                    VOICE_WORKERS, VOICE_CHARACTER_QUOTA, TTS_BACKEND, TTS_WHOLE_SCRIPT,
+                    SCRIPT_TTS_MAX_CHARS, SCRIPT_TTS_PADDING, FFMPEG_BINARY)
+from utils.rate_limiter import RateLimiter
+from utils.workspace import DEFAULT_WORKSPACE
+from utils.manifest import artifact_key
+from utils.tts_cache import get_tts_cache
+from utils.telemetry import get_telemetry, timed
 import logging
+import threading
+from functools import lru_cache
 import subprocess  # For potential audio post-processing
 
+VOICE_MODEL_ID = 'eleven_multilingual_v2'
+VOICE_OUTPUT_FORMAT = 'mp3_22050_32'
+
 def load_api_key():
     try:
         with open(ELEVENLABS_API_KEY_FILE, 'r', encoding='utf-8') as f:
@@ -25,66 +37,313 @@ def load_api_key():
         time.sleep(5)
         exit(1)
 
-def generate_voices():
-    """Generate voiceovers for each line in the script."""
+@lru_cache(maxsize=1)
+def get_client():
+    from elevenlabs.client import ElevenLabs  # Only stages that speak pay for the SDK import
+    if ELEVENLABS_BASE_URL:
+        return ElevenLabs(api_key=load_api_key(), base_url=ELEVENLABS_BASE_URL)
+    return ElevenLabs(api_key=load_api_key())
+
+_char_limiter = None
+_char_limiter_lock = threading.Lock()
+
+def get_char_limiter():
+    """One character quota for the whole process, however many jobs share the account"""
+    global _char_limiter
+    with _char_limiter_lock:
+        if _char_limiter is None:
+            _char_limiter = RateLimiter(*VOICE_CHARACTER_QUOTA)
+        return _char_limiter
+
+class ElevenLabsTTS:
+    """ElevenLabs over the network; every job in the process shares the account's character quota"""
+
+    name = "elevenlabs"
+    workers = VOICE_WORKERS  # Concurrent requests (keep within your plan's concurrency limit)
+
+    def key(self, sentence):
+        return artifact_key(text=sentence, voice_id=VOICE_ID, settings=VOICE_SETTINGS,
+                            model_id=VOICE_MODEL_ID, output_format=VOICE_OUTPUT_FORMAT)
+
+    def synthesize(self, sentence, audio_path):
+        """Stream the audio straight into audio_path; returns the size written"""
+        from elevenlabs import VoiceSettings
+        get_char_limiter().acquire(len(sentence))
+        response = get_client().text_to_speech.convert(
+            voice_id=VOICE_ID,
+            optimize_streaming_latency='0',
+            output_format=VOICE_OUTPUT_FORMAT,
+            text=sentence,
+            model_id=VOICE_MODEL_ID,
+            voice_settings=VoiceSettings(**VOICE_SETTINGS)
+        )
+
+        size = 0
+        with open(audio_path, 'wb') as f:
+            for chunk in response:
+                if chunk:
+                    f.write(chunk)
+                    size += len(chunk)
+        get_telemetry().count("http_bytes_received_total", size, provider="elevenlabs")
+        return size
+
+    def synthesize_with_timestamps(self, text, audio_path):
+        """Write the audio for text to audio_path; returns its character alignment
+        ({"characters", "starts", "ends"}, times in seconds)"""
+        from elevenlabs import VoiceSettings
+        get_char_limiter().acquire(len(text))
+        response = get_client().text_to_speech.convert_with_timestamps(
+            voice_id=VOICE_ID,
+            output_format=VOICE_OUTPUT_FORMAT,
+            text=text,
+            model_id=VOICE_MODEL_ID,
+            voice_settings=VoiceSettings(**VOICE_SETTINGS)
+        )
+
+        # SDK versions differ between a dict and a model, and in the audio field's name
+        audio = base64.b64decode(_field(response, "audio_base_64", "audio_base64"))
+        with open(audio_path, 'wb') as f:
+            f.write(audio)
+        get_telemetry().count("http_bytes_received_total", len(audio), provider="elevenlabs")
+        alignment = _field(response, "alignment")
+        if alignment is None:
+            raise ValueError("Response has no alignment")
+        return {
+            "characters": list(_field(alignment, "characters")),
+            "starts": list(_field(alignment, "character_start_times_seconds")),
+            "ends": list(_field(alignment, "character_end_times_seconds")),
+        }
+
+    def warm_up(self):
+        get_client()
+
+def _field(data, *names):
+    for name in names:
+        value = data.get(name) if isinstance(data, dict) else getattr(data, name, None)
+        if value is not None:
+            return value
+    return None
+
+@lru_cache(maxsize=None)
+def get_tts_backend(name=TTS_BACKEND):
+    """TTS backend by name, the local one imported on first use.
+
+    Backends expose name, workers (useful concurrency), key(sentence) (build-manifest key of the
+    narration), synthesize(sentence, audio_path) (writes an mp3, returns its size) and warm_up().
+    ElevenLabs also has synthesize_with_timestamps(text, audio_path) for whole-script narration.
+    """
+    if name == "local":
+        from utils.local_tts import LocalTTS
+        return LocalTTS()
+    return ElevenLabsTTS()
+
+def script_voice_key(backend, sentence):
+    """Key of a line cut from a whole-script narration. It is other audio than the line spoken on its own
+    (read in context, cut mid-pause, re-encoded), so it never stands in for it, in a workspace or the cache."""
+    return artifact_key(narration=backend.key(sentence), mode="script", padding=SCRIPT_TTS_PADDING)
+
+def voice_keys(sentence):
+    """Build-manifest keys a part's narration can have with the configured backend (spoken alone, or cut
+    from a whole-script request)"""
+    backend = get_tts_backend()
+    return backend.key(sentence), script_voice_key(backend, sentence)
+
+def synthesize_sentence(backend, i, sentence, total, workspace=None):
+    """Synthesize one sentence into its partN.mp3.
+
+    Skipped when partN.mp3 was already built from this sentence by the same backend and voice settings,
+    and linked from the TTS cache when any script has had the same line spoken with them.
+    """
+    workspace = workspace or DEFAULT_WORKSPACE
+    audio_path = workspace.audio_dir / f"part{i}.mp3"
+    key = backend.key(sentence)
+    if workspace.manifest.is_fresh(audio_path, key):
+        return False
+    if workspace.manifest.invalidate(audio_path):
+        logging.info(f"[Part {i}] Sentence or voice settings changed, regenerating audio")
+
     try:
-        line_file = OUTPUT_DIR / "line_by_line.txt"
-        if not line_file.exists():
-            raise FileNotFoundError(f"Script file not found: {line_file}")
-        
-        with open(line_file, 'r', encoding='utf-8') as f:
-            sentences = [line.strip() for line in f if line.strip()]
-        
-        client = ElevenLabs(api_key=load_api_key())
-        
-        for i, sentence in enumerate(sentences):
-            try:
-                audio_path = AUDIO_DIR / f"part{i}.mp3"
-                if audio_path.exists():
-                    continue
-                
-                logging.info(f"Generating voice for sentence {i+1}/{len(sentences)}")
-                
-                response = client.text_to_speech.convert(
-                    voice_id=VOICE_ID,
-                    optimize_streaming_latency='0',
-                    output_format='mp3_22050_32',
-                    text=sentence,
-                    model_id='eleven_multilingual_v2',
-                    voice_settings=VoiceSettings(**VOICE_SETTINGS)
-                )
-                
-                with open(audio_path, 'wb') as f:
-                    for chunk in response:
-                        if chunk:
-                            f.write(chunk)
-                
-                # Rate limit protection
-                time.sleep(1)
-                
-                # --- Potential Audio Post-Processing (Example: Trimming Silence) ---
-                # This is an example using ffmpeg (you need to install it)
-                # You might need to adjust the parameters for your needs
-                # try:
-                #     subprocess.run([
-                #         "ffmpeg",
-                #         "-i", str(audio_path),
-                #         "-filter:a", "silenceremove=start_periods=1:stop_periods=1:start_threshold=-60dB:stop_threshold=-60dB",
-                #         "-acodec", "libmp3lame",  # Or your preferred codec
-                #         str(audio_path).replace(".mp3", "_trimmed.mp3")
-                #     ], check=True, capture_output=True)
-                #     logging.info(f"Trimmed silence from {audio_path}")
-                #     audio_path.unlink()  # Remove the original
-                #     Path(str(audio_path).replace(".mp3", "_trimmed.mp3")).rename(audio_path) # Rename the trimmed file
-                # except FileNotFoundError:
-                #     logging.warning("ffmpeg not found. Skipping audio trimming.")
-                # except subprocess.CalledProcessError as e:
-                #     logging.error(f"Error trimming audio: {e.stderr.decode()}")
-                
-            except Exception as e:
-                logging.error(f"Failed to generate voice for part {i}: {str(e)}")
-                continue
-                
+        cache = get_tts_cache()
+        if cache.fetch(key, audio_path):
+            logging.info(f"[Part {i}] Line spoken before, reusing cached audio")
+            workspace.manifest.record(audio_path, key)
+            return True
+
+        logging.info(f"Generating voice for sentence {i+1}/{total}")
+        started = time.perf_counter()
+        backend.synthesize(sentence, audio_path)
+        telemetry = get_telemetry()
+        telemetry.observe("tts_request_seconds", time.perf_counter() - started, provider=backend.name)
+        telemetry.count("tts_characters_total", len(sentence), provider=backend.name)
+        cache.store(key, audio_path)
+        workspace.manifest.record(audio_path, key)
+
+        # --- Potential Audio Post-Processing (Example: Trimming Silence) ---
+        # This is an example using ffmpeg (you need to install it)
+        # You might need to adjust the parameters for your needs
+        # try:
+        #     subprocess.run([
+        #         "ffmpeg",
+        #         "-i", str(audio_path),
+        #         "-filter:a", "silenceremove=start_periods=1:stop_periods=1:start_threshold=-60dB:stop_threshold=-60dB",
+        #         "-acodec", "libmp3lame",  # Or your preferred codec
+        #         str(audio_path).replace(".mp3", "_trimmed.mp3")
+        #     ], check=True, capture_output=True)
+        #     logging.info(f"Trimmed silence from {audio_path}")
+        #     audio_path.unlink()  # Remove the original
+        #     Path(str(audio_path).replace(".mp3", "_trimmed.mp3")).rename(audio_path) # Rename the trimmed file
+        # except FileNotFoundError:
+        #     logging.warning("ffmpeg not found. Skipping audio trimming.")
+        # except subprocess.CalledProcessError as e:
+        #     logging.error(f"Error trimming audio: {e.stderr.decode()}")
+
+        return True
+
+    except Exception as e:
+        # Don't leave a truncated file behind, later runs would treat it as done
+        audio_path.unlink(missing_ok=True)
+        logging.error(f"Failed to generate voice for part {i}: {str(e)}")
+        return False
+
+def synthesize_lines(backend, lines, parts, workspace, max_workers=None):
+    """synthesize_sentence for each of parts, up to max_workers (default: what the backend can take) at a time;
+    returns how many were new"""
+    with ThreadPoolExecutor(max_workers=max(1, max_workers or backend.workers)) as executor:
+        futures = [
+            executor.submit(timed, "voice", workspace.root, i, synthesize_sentence,
+                            backend, i, lines[i], len(lines), workspace)
+            for i in parts
+        ]
+        return sum(1 for future in futures if future.result())
+
+def split_times(lines, alignment, padding=SCRIPT_TTS_PADDING):
+    """(start, end) seconds of each line in the narration of "\n".join(lines), from its character timestamps.
+
+    Cuts fall halfway through the pause between two lines; the first line starts and the last one ends
+    `padding` seconds from the speech, dropping the lead-in and trailing silence.
+    """
+    if "".join(alignment["characters"]) != "\n".join(lines):
+        raise ValueError("Alignment does not match the script text")
+    spans = []  # (first spoken character's start, last spoken character's end) per line
+    offset = 0
+    for line in lines:
+        spoken = [offset + i for i, char in enumerate(line) if not char.isspace()]
+        if not spoken:
+            raise ValueError("Script has an empty line")
+        spans.append((alignment["starts"][spoken[0]], alignment["ends"][spoken[-1]]))
+        offset += len(line) + 1
+
+    cuts = [max(0.0, spans[0][0] - padding)]
+    cuts += [(end + start) / 2 for (_, end), (start, _) in zip(spans, spans[1:])]
+    cuts.append(spans[-1][1] + padding)
+    return list(zip(cuts, cuts[1:]))
+
+def split_audio(source, times, targets):
+    """Cut source into one mp3 per (start, end), decoding it once for all of them"""
+    command = [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error", "-i", str(source)]
+    for (start, end), target in zip(times, targets):
+        command += ["-map", "0:a", "-ss", f"{start:.3f}", "-to", f"{end:.3f}",
+                    "-ar", "22050", "-ac", "1", "-b:a", "32k", "-f", "mp3", str(target)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg split failed: {result.stderr.strip()[-2000:]}")
+
+def _request_batches(lines, parts):
+    """Split parts, in order, into requests of at most SCRIPT_TTS_MAX_CHARS characters.
+
+    Parts need not be adjacent: the changed lines of an edited script (say 2 and 7) share one request.
+    """
+    batches = []
+    size = 0
+    for i in parts:
+        if batches and size + 1 + len(lines[i]) <= SCRIPT_TTS_MAX_CHARS:
+            batches[-1].append(i)
+            size += 1 + len(lines[i])
+        else:
+            batches.append([i])
+            size = len(lines[i])
+    return batches
+
+def synthesize_script(backend, lines, workspace=None):
+    """Narrate every line that needs it in one request and cut the audio into partN.mp3 files.
+
+    Lines already cut from a whole-script narration (in this workspace or the TTS cache) are skipped, so an
+    edited script only sends its new lines; parts spoken one by one are redone. Falls back to one request
+    per line when the backend gives no usable character timestamps.
+    Returns how many parts were new.
+    """
+    workspace = workspace or DEFAULT_WORKSPACE
+    workspace.audio_dir.mkdir(parents=True, exist_ok=True)
+    if not hasattr(backend, "synthesize_with_timestamps"):
+        logging.warning(f"The {backend.name} TTS backend has no timestamps, narrating line by line")
+        return synthesize_lines(backend, lines, range(len(lines)), workspace)
+
+    cache = get_tts_cache()
+    generated = 0
+    parts = []
+    for i, sentence in enumerate(lines):
+        audio_path = workspace.audio_dir / f"part{i}.mp3"
+        key = script_voice_key(backend, sentence)
+        if workspace.manifest.is_fresh(audio_path, key):
+            continue
+        workspace.manifest.invalidate(audio_path)
+        if cache.fetch(key, audio_path):
+            workspace.manifest.record(audio_path, key)
+            generated += 1
+        else:
+            parts.append(i)
+    if not parts:
+        return generated
+
+    fallback = []
+    telemetry = get_telemetry()
+    for batch in _request_batches(lines, parts):
+        texts = [lines[i] for i in batch]
+        targets = [workspace.audio_dir / f"part{i}.mp3" for i in batch]
+        script_path = workspace.audio_dir / "script.mp3"
+        try:
+            logging.info(f"Generating voice for {len(batch)} lines in one request")
+            started = time.perf_counter()
+            alignment = backend.synthesize_with_timestamps("\n".join(texts), script_path)
+            telemetry.observe("tts_request_seconds", time.perf_counter() - started, provider=backend.name)
+            telemetry.count("tts_characters_total", sum(map(len, texts)), provider=backend.name)
+            split_audio(script_path, split_times(texts, alignment), targets)
+        except Exception as e:
+            for target in targets:
+                target.unlink(missing_ok=True)
+            logging.warning(f"Whole-script narration failed ({e}), narrating these lines one by one")
+            fallback += batch
+            continue
+        finally:
+            script_path.unlink(missing_ok=True)
+
+        for i, target in zip(batch, targets):
+            key = script_voice_key(backend, lines[i])
+            cache.store(key, target)
+            workspace.manifest.record(target, key)
+        generated += len(batch)
+
+    if fallback:
+        generated += synthesize_lines(backend, lines, fallback, workspace)
+    return generated
+
+def generate_voices(max_workers=None, workspace=None, backend=None):
+    """Generate voiceovers for each line in the script: in one request with TTS_WHOLE_SCRIPT, otherwise
+    one per line, up to max_workers (default: what the backend can take) at a time."""
+    workspace = workspace or DEFAULT_WORKSPACE
+    backend = backend or get_tts_backend()
+    try:
+        started = time.perf_counter()
+        sentences = workspace.read_lines()
+        workspace.audio_dir.mkdir(parents=True, exist_ok=True)
+
+        if TTS_WHOLE_SCRIPT:
+            generated = synthesize_script(backend, sentences, workspace)
+        else:
+            generated = synthesize_lines(backend, sentences, range(len(sentences)), workspace, max_workers)
+
+        logging.info(f"Voice generation finished: {generated} new of {len(sentences)} parts "
+                     f"in {time.perf_counter() - started:.1f}s")
         return True
         
     except Exception as e:
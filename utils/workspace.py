@@ -0,0 +1,53 @@
+# utils/workspace.py
+import threading
+from pathlib import Path
+
+from config import OUTPUT_DIR
+from utils.manifest import Manifest
+
+
+class Workspace:
+    """Where one job keeps its script, part files and final video.
+
+    Caches (translations, searches, assets, segments) live in CACHE_DIR and are shared by every workspace.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.audio_dir = self.root / "audio"
+        self.image_dir = self.root / "images"
+        self.video_clip_dir = self.root / "video_clips"
+        self.script_file = self.root / "script.md"
+        self.line_file = self.root / "line_by_line.txt"
+        self.plain_text_file = self.root / "plain_text.txt"
+        self.output_video = self.root / "youtube_short.mp4"
+        self.manifest_file = self.root / "manifest.json"
+        self._manifest = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"Workspace({str(self.root)!r})"
+
+    @property
+    def manifest(self):
+        """Build manifest, loaded once and shared by every stage thread of the job"""
+        with self._lock:
+            if self._manifest is None:
+                self._manifest = Manifest(self.manifest_file)
+            return self._manifest
+
+    def create(self):
+        for directory in [self.root, self.audio_dir, self.image_dir, self.video_clip_dir]:
+            directory.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def read_lines(self):
+        """Non-empty script lines"""
+        if not self.line_file.exists():
+            raise FileNotFoundError(f"Script file not found: {self.line_file}")
+        with open(self.line_file, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+
+
+# Same layout as the single-run paths in config.py
+DEFAULT_WORKSPACE = Workspace(OUTPUT_DIR)
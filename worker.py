@@ -0,0 +1,120 @@
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from config import WORKER_DIR, WORKER_JOBS, WORKER_POLL_INTERVAL
+from utils.job_queue import JobQueue, read_topics
+
+
+class Worker:
+    """Long-lived process that keeps imports, API clients and render processes warm and runs queued jobs.
+
+    Run one worker per queue file; it runs up to `jobs` jobs at once itself.
+    """
+
+    def __init__(self, queue, jobs=WORKER_JOBS, root=WORKER_DIR):
+        self.queue = queue
+        self.jobs = max(1, jobs)
+        self.root = root
+        self.stopping = threading.Event()
+
+    def warm_up(self):
+        """Pay every one-off startup cost before the first job arrives"""
+        from utils import pipeline  # Every stage module
+        from utils.renderers import get_renderer
+        from utils.gemini import load_api_key
+        from utils.voice_gen import get_tts_backend
+        from utils.video_clip_gen import load_pexels_api_key
+        from utils.segment_cache import get_render_pool, render_workers
+
+        get_renderer()  # MoviePy, when it is the configured backend
+        load_api_key()
+        get_tts_backend().warm_up()  # API client, or the local engine processes
+        load_pexels_api_key()
+        if render_workers() > 1:
+            # Fork the render processes now, while this process already has everything imported
+            pool = get_render_pool()
+            for future in [pool.submit(os.getpid) for _ in range(render_workers())]:
+                future.result()
+
+    def run(self, job):
+        from batch import run_job
+        from utils.workspace import Workspace
+
+        workspace = Workspace(self.root / f"{job['id']:06d}")
+        self.queue.update(job["id"], workspace=str(workspace.root))
+        result = run_job(job["id"], job["topic"], workspace)
+        self.queue.finish(job["id"], output=result.get("output"), error=result.get("error"))
+
+    def serve(self):
+        self.warm_up()
+        requeued = self.queue.requeue_running()
+        if requeued:
+            logging.info(f"Requeued {requeued} jobs left running by a previous worker")
+        logging.info(f"Worker ready, running up to {self.jobs} jobs at once")
+
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="job") as executor:
+            while not self.stopping.is_set():
+                running = {future for future in running if not future.done()}
+                if len(running) >= self.jobs:
+                    wait(running, timeout=WORKER_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                    continue
+                job = self.queue.claim()
+                if job:
+                    running.add(executor.submit(self.run, job))
+                else:
+                    self.stopping.wait(WORKER_POLL_INTERVAL)
+            logging.info(f"Stopping, waiting for {len(running)} running jobs")
+
+    def stop(self, *args):
+        self.stopping.set()
+
+def format_job(job):
+    created = datetime.fromtimestamp(job["created"]).strftime('%Y-%m-%d %H:%M:%S')
+    detail = job["output"] or job["error"] or job["workspace"] or ""
+    if job["started"] and job["finished"]:
+        detail = f"{detail} ({job['finished'] - job['started']:.1f}s)"
+    return f"{job['id']:>6}  {job['status']:<8} {created}  {job['topic']}  {detail}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Render worker and its job queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run queued jobs until interrupted")
+    serve.add_argument("-j", "--jobs", type=int, default=WORKER_JOBS, help="jobs run concurrently")
+    submit = commands.add_parser("submit", help="queue topics")
+    submit.add_argument("topics", nargs="*", help="topics to queue")
+    submit.add_argument("-f", "--file", help="text file with one topic per line")
+    status = commands.add_parser("status", help="show jobs")
+    status.add_argument("ids", nargs="*", type=int, help="job ids (default: most recent jobs)")
+    args = parser.parse_args()
+
+    queue = JobQueue()
+    if args.command == "serve":
+        from main import setup_logging
+        setup_logging()
+        worker = Worker(queue, jobs=args.jobs)
+        signal.signal(signal.SIGINT, worker.stop)
+        signal.signal(signal.SIGTERM, worker.stop)
+        worker.serve()
+    elif args.command == "submit":
+        topics = list(args.topics)
+        if args.file:
+            topics += read_topics(args.file)
+        if not topics:
+            parser.error("no topics given")
+        for topic in topics:
+            print(f"{queue.submit(topic)}\t{topic}")
+    else:
+        jobs = [queue.get(job_id) for job_id in args.ids] if args.ids else queue.list()
+        for job in jobs:
+            print(format_job(job) if job else "unknown job")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())